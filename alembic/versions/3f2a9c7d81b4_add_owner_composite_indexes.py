@@ -0,0 +1,31 @@
+"""add_owner_composite_indexes
+
+Revision ID: 3f2a9c7d81b4
+Revises: 5d1c7a190dbb
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f2a9c7d81b4'
+down_revision: Union[str, None] = '5d1c7a190dbb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Every list/detail query filters on owner_id and pages by (created_at, id)
+    op.create_index('ix_tasks_owner_id_created_at_id', 'tasks', ['owner_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_project_id_owner_id', 'tasks', ['project_id', 'owner_id'], unique=False)
+    op.create_index('ix_projects_owner_id_created_at_id', 'projects', ['owner_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_projects_owner_id_created_at_id', table_name='projects')
+    op.drop_index('ix_tasks_project_id_owner_id', table_name='tasks')
+    op.drop_index('ix_tasks_owner_id_created_at_id', table_name='tasks')
@@ -0,0 +1,39 @@
+"""add_task_filter_indexes
+
+Revision ID: 8c4e2b6f1a93
+Revises: 3f2a9c7d81b4
+Create Date: 2026-10-18 14:36:09.527113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4e2b6f1a93'
+down_revision: Union[str, None] = '3f2a9c7d81b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Task list filters (completed, priority) keep the (created_at, id) page order
+    op.create_index('ix_tasks_owner_id_completed_created_at_id', 'tasks', ['owner_id', 'completed', 'created_at', 'id'], unique=False)
+    op.create_index('ix_tasks_owner_id_priority_created_at_id', 'tasks', ['owner_id', 'priority', 'created_at', 'id'], unique=False)
+    # Due-date ranges and sort=due_date
+    op.create_index('ix_tasks_owner_id_due_date_id', 'tasks', ['owner_id', 'due_date', 'id'], unique=False)
+    # overdue=true only ever looks at open tasks
+    op.create_index(
+        'ix_tasks_owner_id_due_date_open', 'tasks', ['owner_id', 'due_date'], unique=False,
+        postgresql_where=sa.text('completed = false'),
+        sqlite_where=sa.text('completed = 0'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tasks_owner_id_due_date_open', table_name='tasks')
+    op.drop_index('ix_tasks_owner_id_due_date_id', table_name='tasks')
+    op.drop_index('ix_tasks_owner_id_priority_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_owner_id_completed_created_at_id', table_name='tasks')
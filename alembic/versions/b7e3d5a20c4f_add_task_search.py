@@ -0,0 +1,75 @@
+"""add_task_search
+
+Revision ID: b7e3d5a20c4f
+Revises: 8c4e2b6f1a93
+Create Date: 2026-10-18 16:02:41.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3d5a20c4f'
+down_revision: Union[str, None] = '8c4e2b6f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# SQLite: an external-content FTS5 table kept in sync by triggers, as created
+# with the tasks table by core/search.py
+SQLITE_FTS5 = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    # Index the tasks that already exist
+    "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS5:
+            op.execute(statement)
+        return
+    # Other databases have no search support (the endpoint answers 501)
+    if dialect != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Title matches rank above description matches; core/search.py queries with the same configuration
+    op.execute(
+        "ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED"
+    )
+    op.create_index('ix_tasks_search_vector', 'tasks', ['search_vector'], unique=False, postgresql_using='gin')
+    # Typo-tolerant title matching
+    op.create_index(
+        'ix_tasks_title_trgm', 'tasks', ['title'], unique=False,
+        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('tasks_fts_ai', 'tasks_fts_ad', 'tasks_fts_au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS tasks_fts')
+        return
+    if dialect != 'postgresql':
+        return
+    op.drop_index('ix_tasks_title_trgm', table_name='tasks')
+    op.drop_index('ix_tasks_search_vector', table_name='tasks')
+    op.drop_column('tasks', 'search_vector')
@@ -0,0 +1,122 @@
+"""add_task_stats_rollup
+
+Revision ID: d41f8a6c3e27
+Revises: b7e3d5a20c4f
+Create Date: 2026-10-18 17:21:53.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f8a6c3e27'
+down_revision: Union[str, None] = 'b7e3d5a20c4f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# NULL stand-ins, as models.NO_PROJECT, NO_PRIORITY and NO_DUE_DATE; completed
+# tasks all share the NO_DUE_DATE row, as they are never overdue
+STATS_KEY = (
+    "{row}.owner_id, coalesce({row}.project_id, 0), coalesce({row}.priority, ''), "
+    "coalesce({row}.completed, false), "
+    "CASE WHEN coalesce({row}.completed, false) THEN DATE '9999-12-31' "
+    "ELSE coalesce({row}.due_date, DATE '9999-12-31') END"
+)
+# The same on SQLite, where booleans are integers and dates ISO strings
+SQLITE_STATS_KEY = (
+    "{row}.owner_id, coalesce({row}.project_id, 0), coalesce({row}.priority, ''), "
+    "coalesce({row}.completed, 0), "
+    "CASE WHEN coalesce({row}.completed, 0) THEN '9999-12-31' "
+    "ELSE coalesce({row}.due_date, '9999-12-31') END"
+)
+STATS_COLUMNS = "owner_id, project_key, priority, completed, due_key"
+SQLITE_TRIGGERS = ('task_stats_ai', 'task_stats_ad', 'task_stats_au')
+
+
+def create_postgres_trigger() -> None:
+    op.execute(f"""
+        CREATE FUNCTION task_stats_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE task_stats SET task_count = task_count - 1
+                WHERE ({STATS_COLUMNS}) = ({STATS_KEY.format(row='OLD')});
+                DELETE FROM task_stats
+                WHERE ({STATS_COLUMNS}) = ({STATS_KEY.format(row='OLD')}) AND task_count <= 0;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO task_stats ({STATS_COLUMNS}, task_count)
+                VALUES ({STATS_KEY.format(row='NEW')}, 1)
+                ON CONFLICT ({STATS_COLUMNS}) DO UPDATE SET task_count = task_stats.task_count + 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    # Fires for COPY (task imports) and set-based UPDATE/DELETE alike
+    op.execute(
+        "CREATE TRIGGER task_stats_maintain "
+        "AFTER INSERT OR DELETE OR UPDATE OF owner_id, project_id, priority, completed, due_date ON tasks "
+        "FOR EACH ROW EXECUTE FUNCTION task_stats_apply()"
+    )
+
+
+def create_sqlite_triggers() -> None:
+    # As created with the tasks table by core/stats.py
+    add_new = (
+        f"INSERT INTO task_stats ({STATS_COLUMNS}, task_count) VALUES ({SQLITE_STATS_KEY.format(row='new')}, 1) "
+        f"ON CONFLICT ({STATS_COLUMNS}) DO UPDATE SET task_count = task_count + 1;"
+    )
+    remove_old = (
+        f"UPDATE task_stats SET task_count = task_count - 1 "
+        f"WHERE ({STATS_COLUMNS}) = ({SQLITE_STATS_KEY.format(row='old')}); "
+        f"DELETE FROM task_stats WHERE ({STATS_COLUMNS}) = ({SQLITE_STATS_KEY.format(row='old')}) "
+        f"AND task_count <= 0;"
+    )
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS task_stats_ai AFTER INSERT ON tasks BEGIN {add_new} END")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS task_stats_ad AFTER DELETE ON tasks BEGIN {remove_old} END")
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS task_stats_au "
+        "AFTER UPDATE OF owner_id, project_id, priority, completed, due_date ON tasks "
+        f"BEGIN {remove_old} {add_new} END"
+    )
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect not in ('postgresql', 'sqlite'):
+        raise NotImplementedError(f"task_stats triggers are not available on {dialect}")
+    op.create_table(
+        'task_stats',
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('project_key', sa.Integer(), nullable=False),
+        sa.Column('priority', sa.String(), nullable=False),
+        sa.Column('completed', sa.Boolean(), nullable=False),
+        sa.Column('due_key', sa.Date(), nullable=False),
+        sa.Column('task_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('owner_id', 'project_key', 'priority', 'completed', 'due_key'),
+    )
+    if dialect == 'postgresql':
+        create_postgres_trigger()
+        key = STATS_KEY
+    else:
+        create_sqlite_triggers()
+        key = SQLITE_STATS_KEY
+    # Backfill in the same transaction: the trigger's lock on tasks holds off writes until commit
+    op.execute(
+        f"INSERT INTO task_stats ({STATS_COLUMNS}, task_count) "
+        f"SELECT {key.format(row='tasks')}, count(*) FROM tasks GROUP BY 1, 2, 3, 4, 5"
+    )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP TRIGGER IF EXISTS task_stats_maintain ON tasks')
+        op.execute('DROP FUNCTION IF EXISTS task_stats_apply()')
+    elif dialect == 'sqlite':
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.drop_table('task_stats')
@@ -0,0 +1,3 @@
+"""
+Performance benchmarks (run as modules from backend/, e.g. python -m benchmarks.bench_cache_invalidation)
+"""
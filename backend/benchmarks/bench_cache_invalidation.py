@@ -0,0 +1,101 @@
+"""Cache invalidation: KEYS-pattern clearing vs generation counters.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cache_invalidation [--keys 100000] [--rounds 200] [--mock]
+
+Fills the keyspace with unrelated keys plus one user's cached pages, then
+times invalidating that user's namespace. Runs against REDIS_URL, or
+against the in-process MockRedisCache with --mock or when Redis is not
+reachable.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from core.cache import MockRedisCache, RedisCache, user_namespace
+from core.redis_pool import redis_pool
+
+USER_PAGES = 20
+
+async def legacy_clear_redis(client, pattern):
+    # What RedisCache.clear_pattern used to do on every write
+    keys = await client.keys(pattern)
+    if keys:
+        await client.delete(*keys)
+
+async def legacy_clear_mock(data, pattern):
+    # What MockRedisCache.clear_pattern used to do on every write
+    prefix = pattern.replace("*", "")
+    for key in [key for key in data if key.startswith(prefix)]:
+        del data[key]
+
+async def fill(cache, client, keys):
+    if client is None:
+        for i in range(keys):
+            cache._data[f"bench:filler:{i}"] = "x"
+        return
+    pipe = client.pipeline(transaction=False)
+    for i in range(keys):
+        pipe.set(f"bench:filler:{i}", "x", ex=600)
+        if i % 10000 == 9999:
+            await pipe.execute()
+    await pipe.execute()
+
+async def add_user_pages(cache, namespace):
+    for page in range(USER_PAGES):
+        await cache.set(await cache.versioned_key(namespace, page * 100, 100), [{"id": page}])
+
+async def timed(rounds, setup, action):
+    samples = []
+    for _ in range(rounds):
+        await setup()
+        start = time.perf_counter()
+        await action()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def report(label, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{label:<28} mean {statistics.mean(samples):9.3f} ms   p99 {p99:9.3f} ms")
+
+async def run(args):
+    client = None
+    if not args.mock:
+        await redis_pool.connect()
+        if await redis_pool.ping():
+            client = redis_pool.client
+    cache = RedisCache() if client is not None else MockRedisCache()
+    backend = "redis" if client is not None else "mock"
+    namespace = user_namespace("tasks", 1)
+
+    print(f"backend={backend} keyspace={args.keys} user_pages={USER_PAGES} rounds={args.rounds}")
+    await fill(cache, client, args.keys)
+    try:
+        pattern = f"{namespace}:*"
+        if client is not None:
+            legacy = await timed(args.rounds, lambda: add_user_pages(cache, namespace),
+                                 lambda: legacy_clear_redis(client, pattern))
+        else:
+            legacy = await timed(args.rounds, lambda: add_user_pages(cache, namespace),
+                                 lambda: legacy_clear_mock(cache._data, pattern))
+        generation = await timed(args.rounds, lambda: add_user_pages(cache, namespace),
+                                 lambda: cache.invalidate(namespace))
+        report("KEYS pattern clear", legacy)
+        report("generation INCR", generation)
+    finally:
+        if client is not None:
+            async for key in client.scan_iter("bench:filler:*", count=10000):
+                await client.delete(key)
+        await redis_pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, default=100000, help="unrelated keys in the keyspace")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--mock", action="store_true", help="use the in-process mock cache")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
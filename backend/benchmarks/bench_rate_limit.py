@@ -0,0 +1,114 @@
+"""Rate limiter throughput: legacy BaseHTTPMiddleware vs GCRA ASGI middleware.
+
+Usage (from backend/):
+    python -m benchmarks.bench_rate_limit [--requests 5000] [--concurrency 50] [--limit 1000] [--mock]
+
+Sends requests through each middleware wrapped around a trivial app and
+reports requests/second plus how many requests each one admitted. With a
+limit below the request count, an exact limiter admits exactly ``limit``
+requests; the legacy GET-then-INCR over-admits under concurrency. Runs
+against REDIS_URL, or without Redis (both limiters fall back) with --mock
+or when Redis is not reachable.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+import redis
+from fastapi import HTTPException, Request
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from core.middleware import RateLimitMiddleware
+from core.redis_pool import REDIS_URL, redis_pool
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    # What core.middleware.RateLimitMiddleware used to do on every request
+    def __init__(self, app, client, max_requests: int = 100, window_seconds: int = 60):
+        super().__init__(app)
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.redis_client = client
+
+    async def dispatch(self, request: Request, call_next):
+        if self.redis_client is None:
+            return await call_next(request)
+        key = f"rate_limit:{request.client.host}"
+        try:
+            current = self.redis_client.get(key)
+            if current is None:
+                self.redis_client.setex(key, self.window_seconds, 1)
+            else:
+                if int(current) >= self.max_requests:
+                    raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
+                self.redis_client.incr(key)
+        except redis.RedisError:
+            pass
+        return await call_next(request)
+
+async def ok(request):
+    return PlainTextResponse("ok")
+
+def make_app():
+    return Starlette(routes=[Route("/tasks", ok)])
+
+async def drive(app, requests, concurrency):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    statuses = Counter()
+    queue = iter(range(requests))
+
+    async def worker(client):
+        for _ in queue:
+            response = await client.get("/tasks")
+            statuses[response.status_code] += 1
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return requests / elapsed, statuses
+
+def report(label, rate, statuses):
+    # The legacy middleware raises HTTPException inside BaseHTTPMiddleware,
+    # which surfaces as a 500 rather than a 429
+    rejected = sum(count for code, count in statuses.items() if code != 200)
+    print(f"{label:<22} {rate:10.0f} req/s   admitted {statuses[200]:6d}   rejected {rejected:6d}")
+
+async def run(args):
+    sync_client = None
+    if not args.mock:
+        await redis_pool.connect()
+        if await redis_pool.ping():
+            sync_client = redis.from_url(REDIS_URL)
+    backend = "redis" if sync_client is not None else "none"
+    print(f"backend={backend} requests={args.requests} concurrency={args.concurrency} limit={args.limit}")
+
+    try:
+        if sync_client is not None:
+            for key in sync_client.scan_iter("rate_limit:*"):
+                sync_client.delete(key)
+        legacy = LegacyRateLimitMiddleware(make_app(), sync_client, max_requests=args.limit, window_seconds=3600)
+        report("legacy (GET+INCR)", *await drive(legacy, args.requests, args.concurrency))
+
+        if sync_client is not None:
+            for key in sync_client.scan_iter("rl:*"):
+                sync_client.delete(key)
+        limiter = RateLimitMiddleware(make_app(), default=f"{args.limit}/3600", routes="")
+        report("ASGI + GCRA script", *await drive(limiter, args.requests, args.concurrency))
+    finally:
+        await redis_pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=1000, help="requests allowed per client")
+    parser.add_argument("--mock", action="store_true", help="run without Redis")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Task list serialization: Pydantic round-trips vs projected rows encoded once.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization [--rows 100] [--rounds 200]
+
+Loads one page of tasks from a temporary SQLite database and times what
+building the /tasks response used to cost (ORM entities, TaskSchema
+validation, a JSON round-trip through the cache, response_model
+validation and stdlib encoding) against the current path (plain column
+rows encoded once with orjson, and sent as is on a cache hit). Hits are
+timed as Redis (L2) hits; L1 hits skip decoding altogether.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from core.cache import DateTimeEncoder
+from core.serialization import dumps, row_dicts, schema_columns
+from database import to_async_url
+from models import Base, Task, User
+from schemas.task import Task as TaskSchema
+
+TASK_LIST = TypeAdapter(List[TaskSchema])
+
+def legacy_response(cached: str) -> bytes:
+    # Cache hit: json.loads, then FastAPI's response_model validation and encoding
+    items = TASK_LIST.validate_python(json.loads(cached))
+    content = jsonable_encoder(items)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+def projected_response(entry: bytes) -> bytes:
+    # L2 hit: decode the cache entry; the page inside is already the response body
+    return orjson.loads(entry)["value"]["body"].encode()
+
+async def legacy_miss(db, owner_id, limit):
+    result = await db.execute(select(Task).where(Task.owner_id == owner_id).order_by(Task.created_at, Task.id).limit(limit))
+    page = [TaskSchema.model_validate(task).model_dump() for task in result.scalars()]
+    return legacy_response(json.dumps(page, cls=DateTimeEncoder))
+
+async def projected_miss(db, owner_id, limit):
+    query = select(*schema_columns(Task, TaskSchema)).where(Task.owner_id == owner_id)
+    result = await db.execute(query.order_by(Task.created_at, Task.id).limit(limit))
+    return dumps(row_dicts(result))
+
+async def measure(sessions, operation, rounds, *args):
+    samples = []
+    for _ in range(rounds):
+        async with sessions() as db:
+            start = time.perf_counter()
+            await operation(db, *args)
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.mean(samples)
+
+def measure_hits(operation, rounds, cached):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        operation(cached)
+    return (time.perf_counter() - start) * 1000 / rounds
+
+async def run(args):
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_async_engine(to_async_url(f"sqlite:///{path}"), poolclass=NullPool)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            user = User(username="bench", email="bench@example.com", hashed_password="x")
+            db.add(user)
+            await db.flush()
+            db.add_all(Task(title=f"Task {i}", description="x" * 80, owner_id=user.id) for i in range(args.rows))
+            await db.commit()
+            owner_id = user.id
+
+        print(f"rows={args.rows} rounds={args.rounds}")
+        legacy = await measure(sessions, legacy_miss, args.rounds, owner_id, args.rows)
+        projected = await measure(sessions, projected_miss, args.rounds, owner_id, args.rows)
+        print(f"{'miss: ORM + pydantic':<28} mean {legacy:8.3f} ms")
+        print(f"{'miss: columns + orjson':<28} mean {projected:8.3f} ms")
+
+        async with sessions() as db:
+            body = await projected_miss(db, owner_id, args.rows)
+        print(f"{'hit: loads + revalidate':<28} mean {measure_hits(legacy_response, args.rounds, body.decode()):8.3f} ms")
+        entry = orjson.dumps({"value": {"body": body.decode(), "next_cursor": None}})
+        print(f"{'hit: pre-encoded page':<28} mean {measure_hits(projected_response, args.rounds, entry):8.3f} ms")
+    finally:
+        await engine.dispose()
+        os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
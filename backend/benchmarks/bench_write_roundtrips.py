@@ -0,0 +1,125 @@
+"""Task update/delete: read-modify-refresh vs single-statement RETURNING.
+
+Usage (from backend/):
+    python -m benchmarks.bench_write_roundtrips [--rounds 500] [--url postgresql://...]
+
+Runs the previous and the current update and delete paths against the
+same rows and reports SQL statements per operation and mean latency. The
+latency gap grows with the network distance to the database; against a
+local SQLite file it mostly shows the statement count. Defaults to a
+temporary SQLite database.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from database import to_async_url
+from models import Base, Task, User
+
+async def legacy_update(db, task_id, owner_id, values):
+    # What update_task used to do: SELECT, setattr, COMMIT, refresh SELECT
+    result = await db.execute(select(Task).where(Task.id == task_id, Task.owner_id == owner_id))
+    task = result.scalars().first()
+    for field, value in values.items():
+        setattr(task, field, value)
+    await db.commit()
+    await db.refresh(task)
+    return task
+
+async def returning_update(db, task_id, owner_id, values):
+    task = (await db.scalars(
+        update(Task).where(Task.id == task_id, Task.owner_id == owner_id).values(**values).returning(Task),
+        execution_options={"synchronize_session": False},
+    )).first()
+    await db.commit()
+    return task
+
+async def legacy_delete(db, task_id, owner_id):
+    # What delete_task used to do: SELECT, session.delete, COMMIT
+    result = await db.execute(select(Task).where(Task.id == task_id, Task.owner_id == owner_id))
+    await db.delete(result.scalars().first())
+    await db.commit()
+
+async def returning_delete(db, task_id, owner_id):
+    await db.execute(
+        delete(Task)
+        .where(Task.id == task_id, Task.owner_id == owner_id)
+        .returning(Task.id)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+async def measure(sessions, statements, operation, task_ids, owner_id, *args):
+    samples, counts = [], []
+    for task_id in task_ids:
+        async with sessions() as db:
+            before = len(statements)
+            start = time.perf_counter()
+            await operation(db, task_id, owner_id, *args)
+            samples.append((time.perf_counter() - start) * 1000)
+            counts.append(len(statements) - before)
+    return statistics.mean(counts), statistics.mean(samples)
+
+def report(label, result):
+    statements, latency = result
+    print(f"{label:<28} {statements:4.1f} statements + COMMIT   mean {latency:8.3f} ms")
+
+async def run(args):
+    path = None
+    url = args.url
+    if url is None:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        url = f"sqlite:///{path}"
+    engine = create_async_engine(to_async_url(url), **({"poolclass": NullPool} if path else {}))
+    sessions = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *rest: statements.append(statement))
+
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            user = User(username=f"bench-{os.getpid()}", email=f"bench-{os.getpid()}@example.com",
+                        hashed_password="x")
+            db.add(user)
+            await db.flush()
+            tasks = [Task(title=f"Task {i}", owner_id=user.id) for i in range(args.rounds * 2)]
+            db.add_all(tasks)
+            await db.commit()
+            owner_id, ids = user.id, [task.id for task in tasks]
+
+        print(f"database={engine.url.get_backend_name()} rounds={args.rounds}")
+        report("update: select+refresh", await measure(
+            sessions, statements, legacy_update, ids[:args.rounds], owner_id, {"completed": True}))
+        report("update: UPDATE RETURNING", await measure(
+            sessions, statements, returning_update, ids[:args.rounds], owner_id, {"completed": False}))
+        report("delete: select+delete", await measure(
+            sessions, statements, legacy_delete, ids[:args.rounds], owner_id))
+        report("delete: DELETE RETURNING", await measure(
+            sessions, statements, returning_delete, ids[args.rounds:], owner_id))
+
+        async with sessions() as db:
+            await db.execute(delete(User).where(User.id == owner_id))
+            await db.commit()
+    finally:
+        await engine.dispose()
+        if path is not None:
+            os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--url", help="database URL (default: temporary SQLite file)")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,55 @@
 # Set test environment variables before any imports
 import os
+import tempfile
 os.environ["TESTING"] = "true"
 os.environ["DATABASE_URL"] = "sqlite:///:memory:"
 os.environ["REDIS_URL"] = "redis://localhost:6379"
+# The suite logs in as the same user hundreds of times; limits have their own tests
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from contextlib import contextmanager
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 from main import app
-from database import get_db
+from database import get_db, get_session_factory
 from models import Base
 from core.security import get_password_hash
+from core.cache import cache
+from core.metrics import instrument_engine
 
-# Test database URL (in-memory SQLite)
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Test database (SQLite file shared by the sync fixtures and the async app)
+_db_fd, _db_path = tempfile.mkstemp(suffix=".db")
+os.close(_db_fd)
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{_db_path}"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Every TestClient runs its own event loop, so the async engine must not
+# keep connections around between tests.
+async_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{_db_path}",
+    poolclass=NullPool,
+)
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+instrument_engine(async_engine.sync_engine)
+
+def pytest_sessionfinish(session, exitstatus):
+    engine.dispose()
+    if os.path.exists(_db_path):
+        os.remove(_db_path)
+
 @pytest.fixture
 def db_session():
     """Create a fresh database for each test."""
@@ -39,24 +64,63 @@ def db_session():
 @pytest.fixture
 def client(db_session):
     """Create a test client with dependency override."""
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+    async def override_get_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingAsyncSessionLocal
+    # The mock cache lives for the whole session; don't leak entries between tests
+    cache.local.clear()
+    cache.remote._data.clear()
     try:
         with TestClient(app) as test_client:
             yield test_client
     finally:
         app.dependency_overrides.clear()
 
+@pytest.fixture
+def async_session_factory(db_session):
+    """Session factory bound to the test database, for async helpers."""
+    return TestingAsyncSessionLocal
+
+@pytest.fixture
+def sql_statements():
+    """Collect the SQL statements the app executes during a test."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def assert_max_queries(sql_statements):
+    """Fail if the block runs more than n SQL statements.
+
+    with assert_max_queries(2):
+        client.get("/projects", headers=auth_headers)
+    """
+    @contextmanager
+    def check(n):
+        start = len(sql_statements)
+        yield
+        executed = sql_statements[start:]
+        assert len(executed) <= n, (
+            f"{len(executed)} queries, expected at most {n}:\n" + "\n".join(executed)
+        )
+
+    return check
+
 @pytest.fixture
 def test_user(db_session):
     """Create a test user."""
     from models import User
-    
+
     user = User(
         username="testuser",
         email="test@example.com",
@@ -76,4 +140,4 @@ def auth_headers(client, test_user):
         data={"username": "testuser", "password": "testpass123"}
     )
     token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"} 
\ No newline at end of file
+    return {"Authorization": f"Bearer {token}"}
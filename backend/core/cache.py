@@ -1,19 +1,57 @@
-import redis
+import asyncio
+import functools
+import inspect
 import json
+import math
 import os
-import sys
-from typing import Any, Optional
+import random
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+import orjson
 from dotenv import load_dotenv
 from datetime import datetime, date
 
+from core.metrics import CACHE_REQUESTS
+from core.redis_pool import IS_TESTING, REDIS_ERRORS, redis_pool
+
 load_dotenv()
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
-IS_TESTING = (
-    os.getenv("TESTING", "false").lower() == "true" or 
-    "pytest" in sys.modules or 
-    "test" in sys.argv[0] if sys.argv else False
-)
+# In-process (L1) cache limits, per worker
+CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", "2048"))
+CACHE_L1_MAX_BYTES = int(os.getenv("CACHE_L1_MAX_BYTES", str(32 * 1024 * 1024)))
+CACHE_L1_TTL = float(os.getenv("CACHE_L1_TTL", "30"))
+INVALIDATION_CHANNEL = "cache:invalidate"
+# List endpoints: how long pages stay fresh, and how long an expired page
+# may still be served while one request refreshes it
+LIST_CACHE_TTL = int(os.getenv("LIST_CACHE_TTL", "300"))
+LIST_CACHE_STALE_TTL = int(os.getenv("LIST_CACHE_STALE_TTL", "30"))
+# Single-flight: lease of the cross-worker load lock, and how often waiters poll
+LOAD_LOCK_LEASE_MS = int(os.getenv("CACHE_LOAD_LOCK_LEASE_MS", "5000"))
+LOAD_WAIT_INTERVAL = 0.05
+
+# Compare-and-delete, so a worker never releases a lock that expired and was re-taken
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+def user_namespace(resource: str, user_id: int) -> str:
+    """Cache namespace for one user's view of a resource, e.g. tasks:user:7."""
+    return f"{resource}:user:{user_id}"
+
+def _generation_key(namespace: str) -> str:
+    return f"gen:{namespace}"
+
+def _generation_seed() -> int:
+    # Counters (re)start from the current time in ms, so a generation lost
+    # with its Redis key never repeats a number that older entries still use.
+    return int(time.time() * 1000)
 
 class DateTimeEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -23,93 +61,484 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
+class LocalLRUCache:
+    """In-process LRU cache bounded by entry count and byte budget, with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get value from cache, dropping it if it has expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: Any, expire: Optional[float] = None, size: int = 0) -> None:
+        """Set value in cache, evicting the least recently used entries.
+
+        ``size`` is the caller's estimate of the value in bytes; it only
+        matters when the cache has a byte budget.
+        """
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.ttl if expire is None else expire)
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        """Delete value from cache."""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+            }
+
 class MockRedisCache:
     """Mock Redis cache for testing."""
     def __init__(self):
         self._data = {}
-    
-    def get(self, key: str) -> Optional[Any]:
-        """Get value from cache."""
+        self.hits = 0
+        self.misses = 0
+
+    async def get_raw(self, key: str) -> Optional[str]:
+        """Get the encoded value from cache."""
         data = self._data.get(key)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    async def set_raw(self, key: str, data: str, expire: int = 300) -> None:
+        """Set an encoded value in cache with expiration in seconds."""
+        self._data[key] = data
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get value from cache."""
+        data = await self.get_raw(key)
         return json.loads(data) if data else None
-    
-    def set(self, key: str, value: Any, expire: int = 300) -> None:
+
+    async def set(self, key: str, value: Any, expire: int = 300) -> None:
         """Set value in cache with expiration in seconds."""
-        self._data[key] = json.dumps(value, cls=DateTimeEncoder)
-    
-    def delete(self, key: str) -> None:
+        await self.set_raw(key, json.dumps(value, cls=DateTimeEncoder), expire)
+
+    async def delete(self, key: str) -> None:
         """Delete value from cache."""
         self._data.pop(key, None)
-    
-    def clear_pattern(self, pattern: str) -> None:
-        """Clear all keys matching pattern."""
-        # Simple pattern matching for tests
-        if '*' in pattern:
-            prefix = pattern.replace('*', '')
-            keys_to_delete = [key for key in self._data if key.startswith(prefix)]
-        else:
-            keys_to_delete = [key for key in self._data if pattern in key]
-        
-        for key in keys_to_delete:
-            del self._data[key]
+
+    async def generation(self, namespace: str) -> Optional[int]:
+        """Current generation counter of a namespace."""
+        key = _generation_key(namespace)
+        if key not in self._data:
+            self._data[key] = str(_generation_seed())
+        return int(self._data[key])
+
+    async def versioned_key(self, namespace: str, *parts: Any) -> str:
+        """Cache key embedding the namespace's current generation."""
+        return ":".join([namespace, f"v{await self.generation(namespace)}", *map(str, parts)])
+
+    async def invalidate(self, namespace: str) -> None:
+        """Orphan every entry of a namespace by bumping its generation."""
+        key = _generation_key(namespace)
+        self._data.setdefault(key, str(_generation_seed()))
+        self._data[key] = str(int(self._data[key]) + 1)
+
+    async def publish(self, message: str) -> None:
+        """Single-process mock: there are no other workers to notify."""
+
+    async def acquire_lock(self, name: str, lease_ms: int) -> Optional[str]:
+        """Take a lock unless someone else holds an unexpired one."""
+        held = self._data.get(name)
+        if held is not None and held[1] > time.monotonic():
+            return None
+        token = uuid.uuid4().hex
+        self._data[name] = (token, time.monotonic() + lease_ms / 1000)
+        return token
+
+    async def release_lock(self, name: str, token: str) -> None:
+        held = self._data.get(name)
+        if held is not None and held[0] == token:
+            del self._data[name]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
 
 class RedisCache:
-    def __init__(self):
-        self.redis_client = None
-        if not IS_TESTING:
+    """Cache backed by the shared async Redis pool.
+
+    Every operation degrades to a miss or a no-op when Redis is down or the
+    pool's circuit breaker is open.
+    """
+    def __init__(self, pool=redis_pool):
+        self.pool = pool
+        self.hits = 0
+        self.misses = 0
+
+    async def get_raw(self, key: str) -> Optional[str]:
+        """Get the encoded value from cache."""
+        data = await self.pool.run(lambda client: client.get(key))
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    async def set_raw(self, key: str, data: str, expire: int = 300) -> None:
+        """Set an encoded value in cache with expiration in seconds."""
+        await self.pool.run(lambda client: client.setex(key, expire, data))
+
+    async def delete(self, key: str) -> None:
+        """Delete value from cache."""
+        await self.pool.run(lambda client: client.delete(key))
+
+    async def generation(self, namespace: str) -> Optional[int]:
+        """Current generation counter of a namespace, or None without Redis."""
+        key = _generation_key(namespace)
+
+        async def read(client):
+            value = await client.get(key)
+            if value is None:
+                await client.set(key, _generation_seed(), nx=True)
+                value = await client.get(key)
+            return int(value)
+
+        return await self.pool.run(read)
+
+    async def versioned_key(self, namespace: str, *parts: Any) -> str:
+        """Cache key embedding the namespace's current generation.
+
+        Falls back to an unversioned key when Redis is unavailable; get and
+        set are no-ops then anyway.
+        """
+        generation = await self.generation(namespace)
+        version = "v-" if generation is None else f"v{generation}"
+        return ":".join([namespace, version, *map(str, parts)])
+
+    async def invalidate(self, namespace: str) -> None:
+        """Orphan every entry of a namespace with a single INCR.
+
+        Entries under the old generation are never read again and expire
+        through their TTL, so nothing has to scan the keyspace.
+        """
+        key = _generation_key(namespace)
+
+        async def bump(client):
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.set(key, _generation_seed(), nx=True)
+                pipe.incr(key)
+                await pipe.execute()
+
+        await self.pool.run(bump)
+
+    async def publish(self, message: str) -> None:
+        """Broadcast an invalidation message to every worker."""
+        await self.pool.run(lambda client: client.publish(INVALIDATION_CHANNEL, message))
+
+    async def acquire_lock(self, name: str, lease_ms: int) -> Optional[str]:
+        """Take a lock with SET NX PX; returns the owner token, or None if held.
+
+        Without Redis every caller gets the lock; the in-process lock in
+        TieredCache still coalesces requests within this worker.
+        """
+        token = uuid.uuid4().hex
+        acquired = await self.pool.run(
+            lambda client: client.set(name, token, nx=True, px=lease_ms), default=True
+        )
+        return token if acquired else None
+
+    async def release_lock(self, name: str, token: str) -> None:
+        await self.pool.run(lambda client: client.eval(_RELEASE_LOCK_SCRIPT, 1, name, token))
+
+    async def listen(self, handler: Callable[[str], None]) -> None:
+        """Call handler for every invalidation message until cancelled.
+
+        Subscribes on a dedicated connection without a read timeout, so an
+        idle channel keeps its subscription; re-subscribes after connection
+        errors.
+        """
+        while self.pool.client is not None:
+            client = self.pool.subscriber()
             try:
-                self.redis_client = redis.from_url(REDIS_URL, decode_responses=True)
-                # Test the connection
-                self.redis_client.ping()
-            except Exception as e:
-                print(f"Warning: Redis connection failed: {e}")
-                self.redis_client = None
-    
-    def get(self, key: str) -> Optional[Any]:
-        """Get value from cache."""
-        if self.redis_client is None:
-            return None
-        try:
-            data = self.redis_client.get(key)
-            return json.loads(data) if data else None
-        except Exception:
+                async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            handler(message["data"])
+            except REDIS_ERRORS:
+                await asyncio.sleep(1)
+            finally:
+                await client.aclose()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+_L1_HITS = CACHE_REQUESTS.labels("l1", "hit")
+_L1_MISSES = CACHE_REQUESTS.labels("l1", "miss")
+_L2_HITS = CACHE_REQUESTS.labels("l2", "hit")
+_L2_MISSES = CACHE_REQUESTS.labels("l2", "miss")
+
+class TieredCache:
+    """Two-tier cache: a per-process LocalLRUCache (L1) in front of Redis (L2).
+
+    L1 keeps decoded values, so a hit costs neither a network round-trip nor
+    a decode; L2 values are encoded with orjson. Namespace generations are
+    cached in L1 as well; writes in any worker publish the namespace or key
+    they invalidated, and every worker drops its L1 copy. L1 entries live at
+    most ``local_ttl`` seconds, which bounds staleness should a pub/sub
+    message be lost.
+    """
+
+    def __init__(self, remote, local: LocalLRUCache):
+        self.remote = remote
+        self.local = local
+        # Generations for namespaces while Redis is unreachable, so local
+        # writes still orphan local entries.
+        self._fallback_generations = {}
+        # Per-key locks for single-flight loads; dropped once nobody holds them
+        self._load_locks = weakref.WeakValueDictionary()
+        self._listener: Optional[asyncio.Task] = None
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get value from L1, falling back to Redis."""
+        value = self.local.get(key)
+        if value is not None:
+            _L1_HITS.inc()
+            return value
+        _L1_MISSES.inc()
+        data = await self.remote.get_raw(key)
+        if not data:
+            _L2_MISSES.inc()
             return None
-    
-    def set(self, key: str, value: Any, expire: int = 300) -> None:
-        """Set value in cache with expiration in seconds."""
-        if self.redis_client is None:
-            return
-        try:
-            self.redis_client.setex(
-                key,
-                expire,
-                json.dumps(value, cls=DateTimeEncoder)
-            )
-        except Exception:
-            pass
-    
-    def delete(self, key: str) -> None:
-        """Delete value from cache."""
-        if self.redis_client is None:
-            return
-        try:
-            self.redis_client.delete(key)
-        except Exception:
-            pass
-    
-    def clear_pattern(self, pattern: str) -> None:
-        """Clear all keys matching pattern."""
-        if self.redis_client is None:
-            return
-        try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                self.redis_client.delete(*keys)
-        except Exception:
-            pass
+        _L2_HITS.inc()
+        value = orjson.loads(data)
+        self.local.set(key, value, size=len(data))
+        return value
+
+    async def set(self, key: str, value: Any, expire: int = 300, local_expire: Optional[float] = None) -> None:
+        """Set value in both tiers; L1 keeps it for at most its own TTL."""
+        data = orjson.dumps(value)
+        await self.remote.set_raw(key, data, expire)
+        local_ttl = min(expire, self.local.ttl if local_expire is None else local_expire)
+        self.local.set(key, value, expire=local_ttl, size=len(data))
+
+    async def delete(self, key: str) -> None:
+        """Delete value from both tiers and from every worker's L1."""
+        self.local.delete(key)
+        await self.remote.delete(key)
+        await self.remote.publish(f"key:{key}")
+
+    async def shared_generation(self, namespace: str) -> Optional[int]:
+        """Namespace generation every worker agrees on, or None without Redis."""
+        gen_key = _generation_key(namespace)
+        generation = self.local.get(gen_key)
+        if generation is None:
+            generation = await self.remote.generation(namespace)
+            if generation is not None:
+                self.local.set(gen_key, generation)
+        return generation
+
+    async def generation(self, namespace: str) -> int:
+        generation = await self.shared_generation(namespace)
+        if generation is None:
+            return self._fallback_generations.setdefault(namespace, _generation_seed())
+        return generation
+
+    async def versioned_key(self, namespace: str, *parts: Any) -> str:
+        """Cache key embedding the namespace's current generation."""
+        return ":".join([namespace, f"v{await self.generation(namespace)}", *map(str, parts)])
+
+    async def invalidate(self, namespace: str) -> None:
+        """Bump the namespace generation and tell every worker to forget theirs."""
+        await self.remote.invalidate(namespace)
+        self.local.delete(_generation_key(namespace))
+        if namespace in self._fallback_generations:
+            self._fallback_generations[namespace] += 1
+        await self.remote.publish(f"ns:{namespace}")
+
+    def handle_invalidation(self, message: str) -> None:
+        """Apply an invalidation message published by any worker."""
+        kind, _, target = message.partition(":")
+        if kind == "ns":
+            self.local.delete(_generation_key(target))
+        elif kind == "key":
+            self.local.delete(target)
+
+    def start_listener(self) -> None:
+        """Subscribe to cross-worker invalidations (no-op without Redis)."""
+        if self._listener is None and hasattr(self.remote, "listen"):
+            self._listener = asyncio.create_task(self.remote.listen(self.handle_invalidation))
+
+    async def stop_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def _load_lock(self, key: str) -> asyncio.Lock:
+        lock = self._load_locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._load_locks[key] = lock
+        return lock
+
+    async def _load_and_store(
+        self, key: str, loader: Callable[[], Awaitable[Any]], expire: int, stale_ttl: int
+    ) -> Any:
+        start = time.time()
+        value = await loader()
+        now = time.time()
+        entry = {"value": value, "fresh_until": now + expire, "delta": now - start}
+        await self.set(key, entry, expire=expire + stale_ttl)
+        return value
+
+    def _needs_refresh(self, entry: dict, beta: float) -> bool:
+        """Stale, or picked for early refresh (XFetch, Vattani et al.).
+
+        The closer an entry is to expiry, and the longer it took to compute,
+        the likelier a reader is to recompute it ahead of time, so refreshes
+        spread out instead of all landing on the expiry instant.
+        """
+        now = time.time()
+        if now >= entry["fresh_until"]:
+            return True
+        if beta <= 0:
+            return False
+        return now - entry["delta"] * beta * math.log(1.0 - random.random()) >= entry["fresh_until"]
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        expire: int = 300,
+        stale_ttl: int = 0,
+        beta: float = 1.0,
+    ) -> Any:
+        """Return the cached value for key, running loader at most once per miss.
+
+        Concurrent misses on the same key are coalesced: one caller per
+        worker takes an in-process lock, one worker across the fleet takes a
+        short Redis lease, and everybody else waits for the value it stores.
+        With ``stale_ttl`` an expired entry is still served for that long
+        while a single caller refreshes it; ``beta`` tunes the probabilistic
+        early refresh (0 disables it).
+        """
+        entry = await self.get(key)
+        if entry is not None:
+            if not self._needs_refresh(entry, beta):
+                return entry["value"]
+            if time.time() < entry["fresh_until"] + stale_ttl:
+                # Serve what we have unless we win the right to refresh it
+                lock = self._load_lock(key)
+                if lock.locked():
+                    return entry["value"]
+                async with lock:
+                    token = await self.remote.acquire_lock(f"lock:{key}", LOAD_LOCK_LEASE_MS)
+                    if token is None:
+                        return entry["value"]
+                    try:
+                        return await self._load_and_store(key, loader, expire, stale_ttl)
+                    finally:
+                        await self.remote.release_lock(f"lock:{key}", token)
+
+        async with self._load_lock(key):
+            # Whoever held the lock before us has probably filled the cache
+            entry = await self.get(key)
+            if entry is not None and time.time() < entry["fresh_until"]:
+                return entry["value"]
+            deadline = time.monotonic() + LOAD_LOCK_LEASE_MS / 1000
+            token = await self.remote.acquire_lock(f"lock:{key}", LOAD_LOCK_LEASE_MS)
+            while token is None and time.monotonic() < deadline:
+                # Another worker is loading this key; wait for its result
+                await asyncio.sleep(LOAD_WAIT_INTERVAL)
+                entry = await self.get(key)
+                if entry is not None and time.time() < entry["fresh_until"]:
+                    return entry["value"]
+                token = await self.remote.acquire_lock(f"lock:{key}", LOAD_LOCK_LEASE_MS)
+            try:
+                return await self._load_and_store(key, loader, expire, stale_ttl)
+            finally:
+                if token is not None:
+                    await self.remote.release_lock(f"lock:{key}", token)
+
+    def cached(
+        self,
+        key_builder: Callable[..., str],
+        expire: int = 300,
+        stale_ttl: int = 0,
+        beta: float = 1.0,
+    ):
+        """Decorator: cache an async function's result through get_or_load.
+
+        ``key_builder`` is called with the same arguments as the function
+        and may return the key or an awaitable of it.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = key_builder(*args, **kwargs)
+                if inspect.isawaitable(key):
+                    key = await key
+                return await self.get_or_load(
+                    key, lambda: func(*args, **kwargs), expire=expire, stale_ttl=stale_ttl, beta=beta
+                )
+            return wrapper
+        return decorator
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters per tier."""
+        return {"l1": self.local.stats(), "l2": self.remote.stats()}
 
 # Create the appropriate cache instance
-if IS_TESTING:
-    cache = MockRedisCache()
-else:
-    cache = RedisCache() 
\ No newline at end of file
+cache = TieredCache(
+    remote=MockRedisCache() if IS_TESTING else RedisCache(),
+    local=LocalLRUCache(
+        max_entries=CACHE_L1_MAX_ENTRIES,
+        max_bytes=CACHE_L1_MAX_BYTES,
+        ttl=CACHE_L1_TTL,
+    ),
+)
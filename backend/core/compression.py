@@ -0,0 +1,241 @@
+import base64
+import gzip
+import os
+import re
+import zlib
+from typing import Dict, Iterable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional codec
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+# Bodies smaller than this are sent as is; compression would barely pay off
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Bodies (or streamed chunks) at least this large are compressed in a worker thread
+COMPRESSION_THREAD_MIN_SIZE = int(os.getenv("COMPRESSION_THREAD_MIN_SIZE", str(64 * 1024)))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+# Encodings cached list pages are stored in, next to their JSON
+COMPRESSION_CACHED_ENCODINGS = os.getenv("COMPRESSION_CACHED_ENCODINGS", "br,gzip")
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "+json", "+xml")
+
+class _GzipStream:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class _BrotliStream:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+class _ZstdStream:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+# Supported encodings in order of preference: one-shot and streaming compressors
+ENCODINGS: Dict[str, tuple] = {}
+if zstandard is not None:
+    ENCODINGS["zstd"] = (lambda data: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), _ZstdStream)
+if brotli is not None:
+    ENCODINGS["br"] = (lambda data: brotli.compress(data, quality=BROTLI_QUALITY), _BrotliStream)
+ENCODINGS["gzip"] = (lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0), _GzipStream)
+
+_ENCODED_ETAG = re.compile(r'-(?:gzip|br|zstd)"$')
+
+def negotiate(accept_encoding: Optional[str], available: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """Best of the available encodings for an Accept-Encoding header, or None.
+
+    Highest q-value wins; ties go to the first available encoding.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        match = re.search(r"q\s*=\s*([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        weights[name.strip()] = quality
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Give a compressed representation its own strong validator."""
+    if etag.startswith('"') and etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+def strip_encoding(etag: str) -> str:
+    """The identity validator behind a tag returned by encoded_etag."""
+    return _ENCODED_ETAG.sub('"', etag)
+
+async def compress(data: bytes, encoding: str) -> bytes:
+    """Compress in one go, in a worker thread when the body is large."""
+    one_shot = ENCODINGS[encoding][0]
+    if len(data) >= COMPRESSION_THREAD_MIN_SIZE:
+        return await run_in_threadpool(one_shot, data)
+    return one_shot(data)
+
+async def precompress(data: bytes) -> Dict[str, str]:
+    """Cacheable compressed variants of a body (base64, as cache values are text)."""
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return {}
+    variants = {}
+    for encoding in COMPRESSION_CACHED_ENCODINGS.split(","):
+        encoding = encoding.strip()
+        if encoding in ENCODINGS:
+            variants[encoding] = base64.b64encode(await compress(data, encoding)).decode()
+    return variants
+
+class PrecompressedResponse(Response):
+    """A response sent in whichever prepared variant the client accepts.
+
+    Used for cached pages whose compressed forms were stored with them, so
+    serving one costs no compression at all. The compression middleware
+    leaves responses that already have a Content-Encoding alone.
+    """
+
+    def __init__(self, content: bytes, variants: Dict[str, bytes], **kwargs):
+        super().__init__(content, **kwargs)
+        self.variants = variants
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.headers.add_vary_header("Accept-Encoding")
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"), self.variants)
+        if encoding is not None:
+            self.body = self.variants[encoding]
+            self.headers["content-encoding"] = encoding
+            self.headers["content-length"] = str(len(self.body))
+            if "etag" in self.headers:
+                self.headers["etag"] = encoded_etag(self.headers["etag"], encoding)
+        await super().__call__(scope, receive, send)
+
+def compressed_response(body, variants: Dict[str, str], headers: Optional[dict] = None, **kwargs) -> Response:
+    """Response for a cached body and its stored variants (see precompress)."""
+    if not variants:
+        return Response(content=body, headers=headers, **kwargs)
+    decoded = {encoding: base64.b64decode(data) for encoding, data in variants.items()}
+    return PrecompressedResponse(body, decoded, headers=headers, **kwargs)
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return (
+        "content-encoding" not in headers
+        and "no-transform" not in headers.get("cache-control", "").lower()
+        and content_type != "text/event-stream"
+        and any(kind in content_type for kind in COMPRESSIBLE_TYPES)
+    )
+
+class CompressionMiddleware:
+    """Negotiated zstd, brotli or gzip compression of text responses.
+
+    Whole bodies under ``min_size`` are left alone; streamed bodies are
+    compressed chunk by chunk as they are produced. Large bodies and chunks
+    are compressed in a worker thread so the event loop keeps serving
+    other requests.
+    """
+
+    def __init__(self, app: ASGIApp, min_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        start: Optional[Message] = None
+        stream = None
+        passthrough = False
+
+        async def compress_chunk(data: bytes) -> bytes:
+            if len(data) >= COMPRESSION_THREAD_MIN_SIZE:
+                return await run_in_threadpool(stream.compress, data)
+            return stream.compress(data)
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, stream, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if not _compressible(headers):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Hold the headers until the first body chunk shows what we are sending
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                start["headers"] = list(start["headers"])
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                pending, start = start, None
+                if encoding is None or (not more_body and len(body) < self.min_size):
+                    passthrough = True
+                    await send(pending)
+                    await send(message)
+                    return
+                headers["content-encoding"] = encoding
+                if "etag" in headers:
+                    headers["etag"] = encoded_etag(headers["etag"], encoding)
+                if not more_body:
+                    body = await compress(body, encoding)
+                    headers["content-length"] = str(len(body))
+                    await send(pending)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                del headers["content-length"]
+                stream = ENCODINGS[encoding][1]()
+                await send(pending)
+
+            data = await compress_chunk(body) if body else b""
+            if not more_body:
+                data += stream.finish()
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
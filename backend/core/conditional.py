@@ -0,0 +1,81 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import HTTPException, Response, status
+
+from core.cache import cache
+from core.compression import strip_encoding
+
+# Clients may store responses but must revalidate them (cheaply, with a 304)
+ETAG_CACHE_CONTROL = "private, no-cache"
+
+def _digest(value: str, size: int = 16) -> str:
+    return hashlib.blake2b(value.encode(), digest_size=size).hexdigest()
+
+async def version_etag(namespace: str, *parts: Any, variant: Any = None) -> Optional[str]:
+    """Strong ETag built from a cache namespace's generation, without reading rows.
+
+    Every write to the namespace bumps its generation, so the tag changes
+    whenever the data behind the response may have. ``parts`` identify the
+    resource, ``variant`` its representation (fields, filters, page); only
+    the resource part takes part in If-Match. Returns None while Redis is
+    unreachable, as per-worker generations cannot tell workers' writes apart.
+    """
+    generation = await cache.shared_generation(namespace)
+    if generation is None:
+        return None
+    etag = _digest(":".join([namespace, f"v{generation}", *map(str, parts)]))
+    if variant is not None:
+        etag += "-" + _digest(str(variant), 8)
+    return f'"{etag}"'
+
+def _opaque(etag: str) -> str:
+    # Compressed responses carry the tag with an encoding suffix; compare the version behind it
+    etag = etag.strip()
+    return strip_encoding(etag[2:].strip() if etag.startswith("W/") else etag)
+
+def none_match(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """True when If-None-Match lists etag (weak comparison).
+
+    ``*`` never matches: the tag comes from a generation counter, so it
+    exists whether or not the resource does, and a 304 for ``*`` could
+    stand in for a 404.
+    """
+    if not if_none_match or etag is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return _opaque(etag) in {_opaque(tag) for tag in tags}
+
+def not_modified(etag: str) -> Response:
+    """An empty 304 carrying the validator the client already holds."""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL, "Vary": "Authorization"},
+    )
+
+def set_etag(response: Response, etag: Optional[str]) -> None:
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = ETAG_CACHE_CONTROL
+        response.headers["Vary"] = "Authorization"
+
+def require_match(if_match: Optional[str], etag: Optional[str]) -> None:
+    """Enforce If-Match (strong comparison, representation variant ignored).
+
+    Raises 412 unless the header is absent, ``*``, or names the current
+    version of the resource. Without a current validator (Redis
+    unreachable, so no ETags are issued either) the precondition cannot be
+    evaluated and is skipped rather than reported as a conflict.
+    """
+    if if_match is None or etag is None:
+        return
+    tags = [tag.strip() for tag in if_match.split(",")]
+    if "*" in tags:
+        return
+    current = etag.strip('"').split("-")[0]
+    if any(not tag.startswith("W/") and tag.strip('"').split("-")[0] == current for tag in tags):
+        return
+    raise HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Resource has changed since it was fetched",
+    )
@@ -0,0 +1,106 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (milliseconds) of the checkout wait-time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class PoolMetrics:
+    """Checkout counters and a wait-time histogram for one connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_sum_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.bucket_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def observe_wait(self, wait_ms: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_count += 1
+            self.wait_sum_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            for i, bound in enumerate(WAIT_BUCKETS_MS):
+                if wait_ms <= bound:
+                    self.bucket_counts[i] += 1
+                    break
+            else:
+                self.bucket_counts[-1] += 1
+
+    def observe_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the histogram with cumulative bucket counts, Prometheus-style."""
+        with self._lock:
+            buckets = {}
+            running = 0
+            for bound, count in zip(WAIT_BUCKETS_MS, self.bucket_counts):
+                running += count
+                buckets[str(bound)] = running
+            buckets["+Inf"] = running + self.bucket_counts[-1]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms": {
+                    "count": self.wait_count,
+                    "sum": round(self.wait_sum_ms, 3),
+                    "max": round(self.wait_max_ms, 3),
+                    "buckets": buckets,
+                },
+            }
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waits."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        # Covers both waiting for a free slot and opening a new connection
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.observe_timeout()
+            raise
+        self.metrics.observe_wait((time.perf_counter() - start) * 1000)
+        return connection
+
+def pool_status(engine) -> Dict[str, Any]:
+    """Describe the live state of an engine's connection pool."""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            "recycle": pool._recycle,
+            "pre_ping": pool._pre_ping,
+        })
+    else:
+        status["status"] = pool.status()
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
@@ -0,0 +1,69 @@
+import csv
+import io
+import os
+from typing import AsyncIterator, List, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from core.cache import DateTimeEncoder
+
+# Rows fetched per round-trip from the server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+_encoder = DateTimeEncoder(separators=(",", ":"))
+
+async def stream_partitions(session_factory: async_sessionmaker, query) -> AsyncIterator[Sequence]:
+    """Yield the query's rows in batches from a server-side cursor.
+
+    Only one batch is held in memory at a time; the session lives exactly
+    as long as the stream.
+    """
+    async with session_factory() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield partition
+
+async def ndjson_chunks(columns: List[str], partitions: AsyncIterator[Sequence]) -> AsyncIterator[bytes]:
+    """One JSON object per row, one chunk per batch."""
+    async for rows in partitions:
+        yield "".join(
+            _encoder.encode(dict(zip(columns, row))) + "\n" for row in rows
+        ).encode()
+
+async def csv_chunks(columns: List[str], partitions: AsyncIterator[Sequence]) -> AsyncIterator[bytes]:
+    """A header line, then one chunk of CSV rows per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in partitions:
+        writer.writerows(
+            [None if value is None else value.isoformat() if hasattr(value, "isoformat") else value
+             for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def export_response(
+    session_factory: async_sessionmaker, query, columns: List[str], fmt: str, filename: str
+) -> StreamingResponse:
+    """Stream the rows of a column select as NDJSON or CSV.
+
+    ``query`` must select plain columns (not ORM entities), named as in
+    ``columns``, so rows are written without building model instances.
+    """
+    chunks = ndjson_chunks if fmt == "ndjson" else csv_chunks
+    return StreamingResponse(
+        chunks(columns, stream_partitions(session_factory, query)),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
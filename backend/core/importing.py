@@ -0,0 +1,162 @@
+import codecs
+import csv
+import json
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Tuple
+
+from sqlalchemy import Table, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Records validated and inserted per round-trip (and per commit)
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Per-line errors returned in the response; the total is always counted
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+# Most lines and characters one CSV record (quoted line breaks included) may span
+IMPORT_MAX_RECORD_LINES = int(os.getenv("IMPORT_MAX_RECORD_LINES", "100"))
+IMPORT_MAX_RECORD_BYTES = int(os.getenv("IMPORT_MAX_RECORD_BYTES", str(64 * 1024)))
+
+class ImportLineError(ValueError):
+    """A line that could not be parsed into a record."""
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines without reading it all first."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+async def ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """(line number, parsed object or ImportLineError) for each non-blank line."""
+    number = 0
+    async for line in lines:
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            record = ImportLineError(f"Invalid JSON: {exc}")
+        else:
+            if not isinstance(record, dict):
+                record = ImportLineError("Expected a JSON object")
+        yield number, record
+
+class _CsvRecordSplitter:
+    """Group physical lines into CSV records, tracking quote state line by line.
+
+    A record spans lines while a quote is open, up to IMPORT_MAX_RECORD_LINES
+    lines and IMPORT_MAX_RECORD_BYTES characters. A quote still open past
+    that, or at the end of the input, is reported at the record's first line
+    and splitting resumes with the line after it, so one stray quote costs
+    one line rather than the rest of the file.
+    """
+
+    def __init__(self):
+        self.pending: Deque[Tuple[int, str]] = deque()
+        self.record: List[Tuple[int, str]] = []
+        self.size = 0
+        self.quoted = False
+
+    def feed(self, number: int, line: str) -> Iterator[Tuple[int, Any]]:
+        self.pending.append((number, line))
+        return self._split(final=False)
+
+    def close(self) -> Iterator[Tuple[int, Any]]:
+        return self._split(final=True)
+
+    def _split(self, final: bool) -> Iterator[Tuple[int, Any]]:
+        """(first line number, record text or ImportLineError) for each complete record."""
+        while self.pending or (final and self.record):
+            if not self.pending:
+                yield self._resync()
+                continue
+            number, line = self.pending.popleft()
+            self.record.append((number, line))
+            self.size += len(line) + 1
+            if line.count('"') % 2:
+                self.quoted = not self.quoted
+            if not self.quoted:
+                start, text = self.record[0][0], "\n".join(part for _, part in self.record)
+                self.record, self.size = [], 0
+                yield start, text
+            elif len(self.record) >= IMPORT_MAX_RECORD_LINES or self.size > IMPORT_MAX_RECORD_BYTES:
+                yield self._resync()
+
+    def _resync(self) -> Tuple[int, ImportLineError]:
+        start = self.record[0][0]
+        self.pending.extendleft(reversed(self.record[1:]))
+        self.record, self.size, self.quoted = [], 0, False
+        return start, ImportLineError("Unterminated quoted field")
+
+async def csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+    """(line number, dict or ImportLineError) for each CSV record after the header.
+
+    Quoted fields may span lines; a record ends at the first line break
+    outside quotes (see _CsvRecordSplitter for the limits). Empty fields
+    become None.
+    """
+    header = None
+    number = 0
+    splitter = _CsvRecordSplitter()
+
+    def parse(start: int, text: Any):
+        nonlocal header
+        if isinstance(text, ImportLineError):
+            return text
+        if not text.strip():
+            return None
+        fields = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in fields]
+            return None
+        if len(fields) != len(header):
+            return ImportLineError(f"Expected {len(header)} fields, got {len(fields)}")
+        return {name: value if value != "" else None for name, value in zip(header, fields)}
+
+    async for line in lines:
+        number += 1
+        for start, text in splitter.feed(number, line):
+            record = parse(start, text)
+            if record is not None:
+                yield start, record
+    for start, text in splitter.close():
+        record = parse(start, text)
+        if record is not None:
+            yield start, record
+
+async def chunked(records: AsyncIterator[Tuple[int, Any]], size: int) -> AsyncIterator[List[Tuple[int, Any]]]:
+    chunk = []
+    async for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+async def copy_rows(db: AsyncSession, table: Table, rows: List[Dict[str, Any]]) -> None:
+    """Insert rows with COPY on Postgres, or one executemany INSERT elsewhere.
+
+    Column defaults are not applied by COPY, so rows must carry every
+    column the table needs.
+    """
+    if not rows:
+        return
+    connection = await db.connection()
+    if connection.dialect.name == "postgresql":
+        columns = list(rows[0])
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            table.name,
+            records=[tuple(row[column] for column in columns) for row in rows],
+            columns=columns,
+        )
+    else:
+        await db.execute(insert(table), rows)
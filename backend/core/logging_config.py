@@ -0,0 +1,64 @@
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" for one object per line, "text" for human-readable local output
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """Render a record and its ``extra`` fields as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RESERVED})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class _LoggingState:
+    listener: Optional[QueueListener] = None
+    handler: Optional[QueueHandler] = None
+
+def start_logging() -> None:
+    """Route log records through a queue drained by a background thread.
+
+    Request handlers only pay for putting the record on the queue; the
+    formatting and the write to stderr happen off the event loop.
+    """
+    if _LoggingState.listener is not None:
+        return
+    output = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    _LoggingState.handler = QueueHandler(log_queue)
+    _LoggingState.listener = QueueListener(log_queue, output)
+    _LoggingState.listener.start()
+    root = logging.getLogger()
+    root.addHandler(_LoggingState.handler)
+    root.setLevel(LOG_LEVEL)
+
+def stop_logging() -> None:
+    """Detach the queue handler and flush the records still queued."""
+    if _LoggingState.listener is None:
+        return
+    logging.getLogger().removeHandler(_LoggingState.handler)
+    _LoggingState.listener.stop()
+    _LoggingState.listener = None
+    _LoggingState.handler = None
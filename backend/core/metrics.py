@@ -0,0 +1,148 @@
+import os
+import time
+from typing import Callable, Dict
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.profiling import record_query
+
+# Set to a shared, writable directory when running several uvicorn/gunicorn
+# workers; each process then writes its samples there and /metrics merges them.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template, method and status code.",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and method.",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "SQL statements executed, by statement type.",
+    ["operation"],
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time, by statement type.",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by tier (l1 = in-process, l2 = Redis) and result.",
+    ["tier", "result"],
+)
+
+def metrics_payload() -> bytes:
+    """Render all metrics of this process, or of every worker in multiprocess mode."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the shared directory on shutdown."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+def _operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+def instrument_engine(sync_engine) -> None:
+    """Count and time every statement run on the engine.
+
+    Each statement is timed once; the measurement feeds the Prometheus
+    metrics and the current request's query profile (core/profiling.py).
+    """
+
+    # The start time lives on the statement's execution context, so a failed
+    # statement (no after_cursor_execute) leaves nothing behind on the pooled
+    # connection; the few executions without a context use a single slot.
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.query_start = time.perf_counter()
+        else:
+            conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = context.query_start if context is not None else conn.info.pop("query_start")
+        elapsed = time.perf_counter() - start
+        operation = _operation(statement)
+        DB_QUERIES.labels(operation).inc()
+        DB_QUERY_LATENCY.labels(operation).observe(elapsed)
+        record_query(statement, parameters, elapsed, executemany)
+
+class MetricsMiddleware:
+    """Request counters, latency histograms and the in-flight gauge.
+
+    Requests are labelled with the matched route template (``/tasks/{task_id}``),
+    not the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._templates: Dict[Callable, str] = {}
+
+    def route_template(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if endpoint not in self._templates:
+            for route in getattr(scope.get("app"), "routes", []):
+                if getattr(route, "endpoint", None) is not None:
+                    self._templates[route.endpoint] = route.path
+        return self._templates.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        in_progress = HTTP_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+
+        async def send_and_record(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            # The router records the matched endpoint in the shared scope
+            await self.app(scope, receive, send_and_record)
+        finally:
+            route = self.route_template(scope)
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            in_progress.dec()
@@ -1,63 +1,267 @@
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from collections import OrderedDict
+from dataclasses import dataclass
 import time
 import json
-from typing import Dict, Any
-import redis
+import logging
+import math
 import os
+from typing import Dict, Any, List, Optional, Tuple
+from jose import JWTError, jwt
+from core.redis_pool import redis_pool
+from core.security import ALGORITHM, SECRET_KEY
+
+# "<limit>/<seconds>" applied per user (or per client IP without a token)
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "100/60")
+# Comma-separated "<METHOD> <path prefix>=<limit>/<seconds>" overrides
+RATE_LIMIT_ROUTES = os.getenv(
+    "RATE_LIMIT_ROUTES",
+    "POST /auth/token=10/60,POST /auth/register=5/60,"
+    "GET /tasks/export=5/60,GET /projects/export=5/60,POST /tasks/import=5/60",
+)
+RATE_LIMIT_EXEMPT = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+# Buckets kept by the in-process fallback before the oldest are dropped
+RATE_LIMIT_LOCAL_KEYS = int(os.getenv("RATE_LIMIT_LOCAL_KEYS", "10000"))
+
+# GCRA: one key per identity holding its theoretical arrival time (TAT) in
+# ms. A request is admitted while TAT - now stays within the window, so the
+# limit is enforced continuously instead of per fixed window. Runs on the
+# server clock so workers need not agree on time.
+# Returns {allowed, remaining, retry_after_ms, reset_ms}.
+_GCRA_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - window
+if now < allow_at then
+    return {0, 0, allow_at - now, tat - now}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now)
+return {1, math.floor((now - allow_at) / interval), 0, new_tat - now}
+"""
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """``limit`` requests per ``period`` seconds for requests matching the rule."""
+    name: str
+    limit: int
+    period: int
+    method: Optional[str] = None
+    prefix: str = "/"
+
+    @property
+    def interval_ms(self) -> int:
+        return max(1, (self.period * 1000) // self.limit)
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method is None or self.method == method) and path.startswith(self.prefix)
+
+def _parse_limit(value: str) -> Tuple[int, int]:
+    limit, period = value.split("/")
+    return int(limit), int(period)
+
+def parse_rules(routes: str) -> List[RateLimitRule]:
+    """Parse RATE_LIMIT_ROUTES into rules, most specific prefix first."""
+    rules = []
+    for entry in filter(None, (part.strip() for part in routes.split(","))):
+        target, value = entry.split("=")
+        method, prefix = target.split()
+        limit, period = _parse_limit(value)
+        rules.append(RateLimitRule(f"{method}:{prefix}", limit, period, method.upper(), prefix))
+    return sorted(rules, key=lambda rule: len(rule.prefix), reverse=True)
+
+class LocalTokenBucket:
+    """In-process token buckets used while Redis is unavailable.
+
+    Limits become per worker rather than global, which is the best a
+    single process can do and keeps the API protected during an outage.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_LOCAL_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def hit(self, key: str, rule: RateLimitRule) -> Tuple[int, int, int, int]:
+        """Same contract as the GCRA script: (allowed, remaining, retry_after_ms, reset_ms)."""
+        now = time.monotonic()
+        rate = rule.limit / rule.period
+        tokens, updated = self._buckets.pop(key, (float(rule.limit), now))
+        tokens = min(float(rule.limit), tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        reset_ms = math.ceil((rule.limit - tokens) / rate * 1000)
+        if allowed:
+            return 1, int(tokens), 0, reset_ms
+        return 0, 0, math.ceil((1 - tokens) / rate * 1000), reset_ms
+
+class RateLimitMiddleware:
+    """Per-user and per-route rate limiting as plain ASGI middleware.
+
+    Each request costs one EVALSHA of the GCRA script, which checks and
+    updates the limit atomically. Responses carry ``RateLimit-Limit``,
+    ``RateLimit-Remaining``, ``RateLimit-Reset`` and ``RateLimit-Policy``;
+    rejected requests get a 429 with ``Retry-After``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        default: str = RATE_LIMIT_DEFAULT,
+        routes: str = RATE_LIMIT_ROUTES,
+        pool=redis_pool,
+    ):
+        self.app = app
+        limit, period = _parse_limit(default)
+        self.default_rule = RateLimitRule("default", limit, period)
+        self.rules = parse_rules(routes)
+        self.pool = pool
+        self.local = LocalTokenBucket()
+        self._script = None
+
+    def rule_for(self, method: str, path: str) -> RateLimitRule:
+        for rule in self.rules:
+            if rule.matches(method, path):
+                return rule
+        return self.default_rule
+
+    @staticmethod
+    def identity(scope: Scope) -> str:
+        """The verified token subject, or the client address for anonymous calls."""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                scheme, _, token = value.decode("latin-1").partition(" ")
+                if scheme.lower() == "bearer" and token:
+                    try:
+                        subject = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+                    except JWTError:
+                        break
+                    if subject:
+                        return f"user:{subject}"
+                break
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def _gcra(self, client, key: str, rule: RateLimitRule):
+        if self._script is None:
+            self._script = client.register_script(_GCRA_SCRIPT)
+        return await self._script(
+            keys=[key], args=[rule.interval_ms, rule.period * 1000], client=client
+        )
+
+    async def hit(self, key: str, rule: RateLimitRule) -> Tuple[int, int, int, int]:
+        result = await self.pool.run(lambda client: self._gcra(client, key, rule))
+        if result is None:
+            return self.local.hit(key, rule)
+        return tuple(int(value) for value in result)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"].startswith(RATE_LIMIT_EXEMPT):
+            await self.app(scope, receive, send)
+            return
+
+        rule = self.rule_for(scope["method"], scope["path"])
+        key = f"rl:{rule.name}:{self.identity(scope)}"
+        allowed, remaining, retry_after_ms, reset_ms = await self.hit(key, rule)
+        headers = [
+            (b"ratelimit-limit", str(rule.limit).encode()),
+            (b"ratelimit-remaining", str(remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(reset_ms / 1000)).encode()),
+            (b"ratelimit-policy", f"{rule.limit};w={rule.period}".encode()),
+        ]
+
+        if not allowed:
+            body = json.dumps({"detail": "Rate limit exceeded. Please try again later."}).encode()
+            headers += [
+                (b"retry-after", str(max(1, math.ceil(retry_after_ms / 1000))).encode()),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ]
+            await send({"type": "http.response.start", "status": 429, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+]
+
+class SecurityHeadersMiddleware:
+    """Add security headers to all responses."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + SECURITY_HEADERS
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+class RequestLoggingMiddleware:
+    """Log one structured record per request once its response has been sent.
+
+    The duration covers the whole response, including streamed bodies. The
+    record's fields travel as ``extra`` so the formatter, not the request
+    path, builds the log line.
+    """
+
+    def __init__(self, app: ASGIApp, logger: logging.Logger = logging.getLogger("taskflow.access")):
+        self.app = app
+        self.logger = logger
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.logger.isEnabledFor(logging.INFO):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_and_record(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Rate limiting middleware to prevent API abuse."""
-    
-    def __init__(self, app, max_requests: int = 100, window_seconds: int = 60):
-        super().__init__(app)
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        try:
-            redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-            self.redis_client = redis.from_url(redis_url)
-        except:
-            self.redis_client = None
-
-    async def dispatch(self, request: Request, call_next):
-        if self.redis_client is None:
-            # If Redis is not available, skip rate limiting
-            return await call_next(request)
-        
-        client_ip = request.client.host
-        key = f"rate_limit:{client_ip}"
-        
         try:
-            current = self.redis_client.get(key)
-            if current is None:
-                self.redis_client.setex(key, self.window_seconds, 1)
-            else:
-                current_count = int(current)
-                if current_count >= self.max_requests:
-                    raise HTTPException(
-                        status_code=429, 
-                        detail="Rate limit exceeded. Please try again later."
-                    )
-                self.redis_client.incr(key)
-        except redis.RedisError:
-            # If Redis fails, allow the request
-            pass
-        
-        return await call_next(request)
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Middleware to add security headers to all responses."""
-    
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        
-        # Add security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
-        return response
+            await self.app(scope, receive, send_and_record)
+        finally:
+            client = scope.get("client")
+            self.logger.info(
+                "request",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                    "client": client[0] if client else None,
+                },
+            )
 
 def sanitize_input(data: Any) -> Any:
     """Sanitize input data to prevent injection attacks."""
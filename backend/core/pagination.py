@@ -0,0 +1,91 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _field(item: Any, name: str) -> Any:
+    """Read a field from an ORM object, schema instance or cached dict."""
+    if isinstance(item, dict):
+        return item[name]
+    return getattr(item, name)
+
+def encode_cursor(created_at: Any, item_id: int) -> str:
+    """Build an opaque cursor pointing just past the given (created_at, id)."""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, item_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+def paginate(query, model, skip: int, limit: int, cursor: Optional[str], descending: bool = False):
+    """Apply (created_at, id) ordering plus offset or keyset paging to a select."""
+    if cursor is not None and skip:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either skip or cursor, not both"
+        )
+    key = tuple_(model.created_at, model.id)
+    if descending:
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.created_at, model.id)
+    if cursor is not None:
+        # Seeks straight to the position instead of scanning skipped rows
+        position = decode_cursor(cursor)
+        query = query.where(key < position if descending else key > position)
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def paginate_sorted(query, model, columns: Sequence[Any], descending: bool, skip: int, limit: int, cursor: Optional[str]):
+    """Order by arbitrary columns (ties broken by id) and page with skip/limit.
+
+    Cursors only encode (created_at, id), so other orderings cannot use them.
+    """
+    if cursor is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor pagination is only available when sorting by created_at"
+        )
+    if descending:
+        order = [column.desc().nulls_last() for column in columns] + [model.id.desc()]
+    else:
+        order = [column.asc().nulls_last() for column in columns] + [model.id]
+    query = query.order_by(*order)
+    if skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def page_key_parts(skip: int, limit: int, cursor: Optional[str]) -> tuple:
+    """Cache key parts identifying one page of a listing."""
+    if cursor is not None:
+        return ("c", cursor, limit)
+    return (skip, limit)
+
+def next_cursor(items: Sequence[Any], limit: int) -> Optional[str]:
+    """Cursor for the page after items, or None when this was the last page."""
+    if limit <= 0 or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(_field(last, "created_at"), _field(last, "id"))
+
+def set_next_cursor(response: Response, cursor: Optional[str]) -> None:
+    """Expose the next page cursor to the client, if there is one."""
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
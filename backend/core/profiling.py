@@ -0,0 +1,88 @@
+import logging
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Statements slower than this are logged with their parameters
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Server-Timing exposes DB timings to clients; turn off where that matters
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+# Longest parameter repr kept in a slow-query log record
+SLOW_QUERY_PARAMS_MAX = 500
+
+logger = logging.getLogger("taskflow.slow_query")
+
+@dataclass
+class QueryStats:
+    """SQL statements issued while serving one request."""
+    count: int = 0
+    duration: float = 0.0
+
+_request_queries: ContextVar[Optional[QueryStats]] = ContextVar("request_queries", default=None)
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Stats of the request being served, or None outside a request."""
+    return _request_queries.get()
+
+def record_query(statement: str, parameters, elapsed: float, executemany: bool) -> None:
+    """Attribute a timed statement to the current request; log it if slow.
+
+    Called by the engine hooks in core/metrics.py, which time each
+    statement once for both the metrics and the request's QueryStats.
+    """
+    stats = _request_queries.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "slow query",
+            extra={
+                "statement": " ".join(statement.split()),
+                "parameters": repr(parameters)[:SLOW_QUERY_PARAMS_MAX],
+                "duration_ms": round(elapsed * 1000, 3),
+                "executemany": executemany,
+            },
+        )
+
+class QueryProfilerMiddleware:
+    """Count each request's SQL statements and report them in ``Server-Timing``.
+
+    Adds ``db;dur=<ms>;desc="<n> queries"`` and ``app;dur=<ms>`` as seen
+    when the response starts; statements issued while a body is streamed
+    are counted but come too late for the header.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _request_queries.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.server_timing:
+                total_ms = (time.perf_counter() - start) * 1000
+                timing = (
+                    f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", '
+                    f"app;dur={total_ms:.1f}"
+                )
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timing.encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_queries.reset(token)
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
+IS_TESTING = (
+    os.getenv("TESTING", "false").lower() == "true" or
+    "pytest" in sys.modules or
+    "test" in sys.argv[0] if sys.argv else False
+)
+
+# Connection pool shared by the cache, the rate limiter and health checks
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "1.0"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+# Circuit breaker: consecutive failures before opening, seconds before a retry
+REDIS_BREAKER_THRESHOLD = int(os.getenv("REDIS_BREAKER_THRESHOLD", "5"))
+REDIS_BREAKER_RESET = float(os.getenv("REDIS_BREAKER_RESET", "10"))
+
+REDIS_ERRORS = (RedisError, OSError, asyncio.TimeoutError)
+
+class CircuitBreaker:
+    """Fail fast after repeated errors instead of waiting out a timeout per call.
+
+    closed: calls go through. open: calls are refused until ``reset_timeout``
+    has passed. half-open: one probe call is let through; its outcome closes
+    or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+class RedisPool:
+    """One redis.asyncio connection pool per worker, guarded by a circuit breaker.
+
+    The app lifespan calls connect() and close(); until then, in tests, or
+    while the breaker is open, run() returns its default without touching
+    the network.
+    """
+
+    def __init__(self, url: str = REDIS_URL):
+        self.url = url
+        self.client: Optional[aioredis.Redis] = None
+        self.breaker = CircuitBreaker(REDIS_BREAKER_THRESHOLD, REDIS_BREAKER_RESET)
+
+    async def connect(self) -> None:
+        if self.client is not None or IS_TESTING:
+            return
+        pool = aioredis.ConnectionPool.from_url(
+            self.url,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+            health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+            decode_responses=True,
+        )
+        self.client = aioredis.Redis(connection_pool=pool)
+        if not await self.ping():
+            print(f"Warning: Redis at {self.url} is not reachable; continuing without it")
+
+    def subscriber(self) -> aioredis.Redis:
+        """A client of its own for a long-lived subscription.
+
+        Pub/sub reads fall back to the socket timeout, and an idle channel
+        is not an error, so this client has none and keeps its connection
+        out of the shared pool.
+        """
+        return aioredis.Redis.from_url(
+            self.url,
+            socket_timeout=None,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+            socket_keepalive=True,
+            health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+            decode_responses=True,
+        )
+
+    async def close(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def run(self, operation: Callable[[aioredis.Redis], Awaitable[Any]], default: Any = None) -> Any:
+        """Run operation(client), or return default if Redis is unavailable or fails."""
+        if self.client is None or not self.breaker.allow():
+            return default
+        try:
+            result = await operation(self.client)
+        except REDIS_ERRORS:
+            self.breaker.record_failure()
+            return default
+        self.breaker.record_success()
+        return result
+
+    async def ping(self) -> bool:
+        return bool(await self.run(lambda client: client.ping(), default=False))
+
+    def stats(self) -> dict:
+        stats = {"connected": self.client is not None, "breaker": self.breaker.state}
+        if self.client is not None:
+            pool = self.client.connection_pool
+            stats.update({
+                "max_connections": pool.max_connections,
+                "in_use": len(pool._in_use_connections),
+                "idle": len(pool._available_connections),
+            })
+        return stats
+
+redis_pool = RedisPool()
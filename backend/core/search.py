@@ -0,0 +1,115 @@
+import html
+import re
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import DDL, column, event, func, literal_column, or_, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Task
+
+# Text search configuration of the tasks.search_vector generated column; queries
+# must use the one the migration indexed with, or the GIN index is not used
+SEARCH_TEXT_CONFIG = "english"
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+# Placeholders the database wraps matches in; the task text is HTML-escaped
+# before they become HIGHLIGHT_START and HIGHLIGHT_STOP
+_MATCH_START = "\x02"
+_MATCH_STOP = "\x03"
+
+# Postgres: tasks.search_vector (title weighted above description) with a GIN
+# index, plus a trigram index on title; both come from the Alembic migration.
+# The column is not mapped on Task, so SQLite's create_all never sees it.
+_search_vector = literal_column("tasks.search_vector")
+
+# SQLite: an external-content FTS5 table kept in sync by triggers, created
+# together with the tasks table so the search endpoint works in tests and
+# local development.
+_fts = table("tasks_fts", column("rowid"))
+_FTS5_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+for statement in _FTS5_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Task.__table__, "before_drop", DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"))
+
+def _fts5_query(q: str) -> str:
+    """Turn free text into an FTS5 query: every word, as a prefix, must match."""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", q))
+
+def highlight_html(fragment: Optional[str]) -> Optional[str]:
+    """Escape a highlighted fragment for HTML and mark up its matches."""
+    if fragment is None:
+        return None
+    return html.escape(fragment).replace(_MATCH_START, HIGHLIGHT_START).replace(_MATCH_STOP, HIGHLIGHT_STOP)
+
+def _postgres_search(owner_id: int, q: str):
+    tsquery = func.websearch_to_tsquery(SEARCH_TEXT_CONFIG, q)
+    # Trigram similarity catches typos and partial words in titles
+    score = func.greatest(func.ts_rank_cd(_search_vector, tsquery), func.similarity(Task.title, q))
+    options = f'StartSel="{_MATCH_START}", StopSel="{_MATCH_STOP}"'
+    return (
+        select(
+            Task,
+            score.label("rank"),
+            func.ts_headline(SEARCH_TEXT_CONFIG, Task.title, tsquery, options + ", HighlightAll=true"),
+            func.ts_headline(
+                SEARCH_TEXT_CONFIG, func.coalesce(Task.description, ""), tsquery, options + ", MaxFragments=2"
+            ),
+        )
+        .where(Task.owner_id == owner_id, or_(_search_vector.op("@@")(tsquery), Task.title.op("%")(q)))
+        .order_by(score.desc(), Task.id)
+    )
+
+def _sqlite_search(owner_id: int, q: str):
+    fts = literal_column("tasks_fts")
+    return (
+        select(
+            Task,
+            # bm25 is lower-is-better; negate it so rank orders like Postgres
+            (-func.bm25(fts, 10.0, 1.0)).label("rank"),
+            func.highlight(fts, 0, _MATCH_START, _MATCH_STOP),
+            func.snippet(fts, 1, _MATCH_START, _MATCH_STOP, "…", 16),
+        )
+        .select_from(_fts)
+        .join(Task, Task.id == _fts.c.rowid)
+        .where(Task.owner_id == owner_id, fts.op("MATCH")(_fts5_query(q)))
+        .order_by(func.bm25(fts, 10.0, 1.0), Task.id)
+    )
+
+async def search_tasks(
+    db: AsyncSession, owner_id: int, q: str, limit: int, skip: int = 0
+) -> List[Tuple[Task, float, str, Any]]:
+    """Rank a user's tasks against q; rows are (task, rank, title, description highlights).
+
+    Highlights are HTML: the task text escaped, matches in <mark> tags.
+    """
+    dialect = (await db.connection()).dialect.name
+    if dialect == "postgresql":
+        query = _postgres_search(owner_id, q)
+    elif dialect == "sqlite":
+        if not _fts5_query(q):
+            return []
+        query = _sqlite_search(owner_id, q)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"Task search is not available on {dialect}",
+        )
+    result = await db.execute(query.offset(skip).limit(limit))
+    return [
+        (task, rank, highlight_html(title), highlight_html(description))
+        for task, rank, title, description in result
+    ]
@@ -1,12 +1,19 @@
+from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 from dotenv import load_dotenv
 
+from core.cache import cache
+from database import get_db
+from models import User
+
 load_dotenv()
 
 # Security configuration
@@ -14,6 +21,10 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Resolved-user cache lifetimes in the in-process tier and in Redis
+PRINCIPAL_LOCAL_TTL = int(os.getenv("PRINCIPAL_LOCAL_TTL", "30"))
+PRINCIPAL_REDIS_TTL = int(os.getenv("PRINCIPAL_REDIS_TTL", "300"))
+
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
@@ -50,4 +61,63 @@ def verify_token(token: str) -> dict:
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
-        ) 
\ No newline at end of file
+        ) 
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user, as much of it as request handlers need."""
+    id: int
+    username: str
+    is_active: bool
+
+def _principal_key(username: str) -> str:
+    return f"auth:principal:{username}"
+
+async def get_cached_principal(username: str) -> Optional[Principal]:
+    """Look the principal up in the local LRU, then in Redis."""
+    data = await cache.get(_principal_key(username))
+    return Principal(**data) if data else None
+
+async def cache_principal(principal: Principal) -> None:
+    await cache.set(
+        _principal_key(principal.username),
+        asdict(principal),
+        expire=PRINCIPAL_REDIS_TTL,
+        local_expire=PRINCIPAL_LOCAL_TTL,
+    )
+
+async def invalidate_principal(username: str) -> None:
+    """Forget a cached principal in every worker, e.g. after deactivation."""
+    await cache.delete(_principal_key(username))
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """Resolve the bearer token to a Principal; only cache misses query the database."""
+    payload = verify_token(token)
+    username = payload.get("sub")
+    if username is None:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+
+    principal = await get_cached_principal(username)
+    if principal is None:
+        result = await db.execute(
+            select(User.id, User.username, User.is_active).where(User.username == username)
+        )
+        row = result.first()
+        if row is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        # is_active is nullable in the schema; treat NULL like the model default
+        principal = Principal(id=row.id, username=row.username, is_active=row.is_active is not False)
+        await cache_principal(principal)
+
+    if not principal.is_active:
+        raise HTTPException(status_code=401, detail="Inactive user")
+    return principal
+
+async def deactivate_user(db: AsyncSession, user: User) -> None:
+    """Deactivate a user and drop their cached principal."""
+    user.is_active = False
+    await db.commit()
+    await invalidate_principal(user.username)
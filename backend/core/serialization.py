@@ -0,0 +1,49 @@
+from typing import Any, Dict, Iterable, List, Optional, Type, Union
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+from core.compression import compressed_response, precompress
+from core.pagination import next_cursor
+
+def dumps(value: Any) -> bytes:
+    """Encode like ORJSONResponse: compact UTF-8, dates and datetimes as ISO 8601."""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+def schema_columns(model, schema: Type[BaseModel]) -> list:
+    """The model's columns for every field of the schema, in the schema's order.
+
+    Selecting these instead of the entity yields plain rows that map 1:1
+    onto the schema's JSON, with no ORM identity map or validation pass.
+    """
+    return [getattr(model, name) for name in schema.model_fields]
+
+def row_dicts(result) -> List[Dict[str, Any]]:
+    """Rows of a column select as dicts keyed by column label."""
+    return [dict(row) for row in result.mappings()]
+
+async def encode_page(
+    items: List[Dict[str, Any]], limit: int, body: Optional[Iterable[Dict[str, Any]]] = None
+) -> dict:
+    """A page ready for caching: its JSON text, compressed variants and next cursor.
+
+    ``body`` overrides what is encoded (e.g. trimmed to ?fields=) while the
+    cursor is still taken from the full items.
+    """
+    data = dumps(list(items if body is None else body))
+    return {
+        "body": data.decode(),
+        "encoded": await precompress(data),
+        "next_cursor": next_cursor(items, limit),
+    }
+
+def json_response(
+    body: Union[str, bytes], headers: Optional[dict] = None, encoded: Optional[Dict[str, str]] = None
+) -> Response:
+    """Send already encoded JSON as is, skipping response_model validation.
+
+    ``encoded`` holds compressed variants from encode_page; the one the
+    client accepts is sent instead of compressing the body again.
+    """
+    return compressed_response(body, encoded or {}, headers=headers, media_type="application/json")
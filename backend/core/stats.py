@@ -0,0 +1,113 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import DDL, and_, case, event, false, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import NO_DUE_DATE, NO_PRIORITY, NO_PROJECT, Task, TaskStat
+
+_STATS_COLUMNS = "owner_id, project_key, priority, completed, due_key"
+
+def _key_of(row: str) -> str:
+    # Same stand-ins for NULL as NO_PROJECT, NO_PRIORITY and NO_DUE_DATE; completed
+    # tasks are never overdue, so they all share the NO_DUE_DATE row
+    no_due_date = f"'{NO_DUE_DATE.isoformat()}'"
+    return (
+        f"{row}.owner_id, coalesce({row}.project_id, {NO_PROJECT}), "
+        f"coalesce({row}.priority, '{NO_PRIORITY}'), coalesce({row}.completed, 0), "
+        f"CASE WHEN coalesce({row}.completed, 0) THEN {no_due_date} "
+        f"ELSE coalesce({row}.due_date, {no_due_date}) END"
+    )
+
+_ADD_NEW = (
+    f"INSERT INTO task_stats ({_STATS_COLUMNS}, task_count) VALUES ({_key_of('new')}, 1) "
+    f"ON CONFLICT ({_STATS_COLUMNS}) DO UPDATE SET task_count = task_count + 1;"
+)
+_REMOVE_OLD = (
+    f"UPDATE task_stats SET task_count = task_count - 1 WHERE ({_STATS_COLUMNS}) = ({_key_of('old')}); "
+    f"DELETE FROM task_stats WHERE ({_STATS_COLUMNS}) = ({_key_of('old')}) AND task_count <= 0;"
+)
+
+# SQLite: triggers created together with the tasks table, like the FTS5
+# index in core/search.py; Postgres gets the same from the Alembic migration.
+_SQLITE_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS task_stats_ai AFTER INSERT ON tasks BEGIN {_ADD_NEW} END",
+    f"CREATE TRIGGER IF NOT EXISTS task_stats_ad AFTER DELETE ON tasks BEGIN {_REMOVE_OLD} END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_au "
+    "AFTER UPDATE OF owner_id, project_id, priority, completed, due_date ON tasks "
+    f"BEGIN {_REMOVE_OLD} {_ADD_NEW} END",
+]
+
+for statement in _SQLITE_TRIGGERS:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+def _counts() -> Dict[str, Any]:
+    return {"total": 0, "completed": 0, "open": 0, "overdue": 0, "completion_rate": 0.0}
+
+def _add(counts: Dict[str, Any], completed: bool, overdue: bool, number: int) -> None:
+    counts["total"] += number
+    counts["completed" if completed else "open"] += number
+    if overdue:
+        counts["overdue"] += number
+    counts["completion_rate"] = round(counts["completed"] / counts["total"], 4) if counts["total"] else 0.0
+
+def _breakdown() -> Dict[str, Any]:
+    return {**_counts(), "by_priority": {}}
+
+async def load_task_stats(
+    db: AsyncSession, owner_id: int, today: date, project_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """Task counts of a user (or one of their projects) from the task_stats rollup.
+
+    One grouped query over the rollup rows, whose number is bounded by the
+    distinct (project, priority) combinations times the distinct due dates
+    of open tasks, not by the number of tasks. Counts are totalled per
+    priority and, for a user, per project (``project_id`` None for tasks
+    without one).
+    """
+    overdue = and_(TaskStat.completed == false(), TaskStat.due_key < today)
+    query = (
+        select(
+            TaskStat.project_key,
+            TaskStat.priority,
+            TaskStat.completed,
+            overdue.label("overdue"),
+            func.sum(TaskStat.task_count),
+        )
+        .where(TaskStat.owner_id == owner_id)
+        .group_by(TaskStat.project_key, TaskStat.priority, TaskStat.completed, overdue)
+    )
+    if project_id is not None:
+        query = query.where(TaskStat.project_key == project_id)
+
+    stats = _breakdown()
+    projects: Dict[int, Dict[str, Any]] = {}
+    for project_key, priority, completed, is_overdue, number in await db.execute(query):
+        completed, is_overdue, number = bool(completed), bool(is_overdue), int(number)
+        if not number:
+            continue
+        priority = priority or "none"
+        project = projects.setdefault(project_key, {
+            **_breakdown(), "project_id": None if project_key == NO_PROJECT else project_key
+        })
+        for target in (stats, project):
+            _add(target, completed, is_overdue, number)
+            _add(target["by_priority"].setdefault(priority, _counts()), completed, is_overdue, number)
+    if project_id is None:
+        stats["projects"] = [projects[key] for key in sorted(projects)]
+    return stats
+
+async def project_task_counts(db: AsyncSession, owner_id: int, project_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    """task_count and completed_count of each project, from the task_stats rollup."""
+    if not project_ids:
+        return {}
+    completed = case((TaskStat.completed == true(), TaskStat.task_count), else_=0)
+    result = await db.execute(
+        select(TaskStat.project_key, func.sum(TaskStat.task_count), func.sum(completed))
+        .where(TaskStat.owner_id == owner_id, TaskStat.project_key.in_(project_ids))
+        .group_by(TaskStat.project_key)
+    )
+    counts = {project_id: {"task_count": 0, "completed_count": 0} for project_id in project_ids}
+    for project_id, total, done in result:
+        counts[project_id] = {"task_count": int(total or 0), "completed_count": int(done or 0)}
+    return counts
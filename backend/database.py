@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
+from core.db_pool import InstrumentedAsyncQueuePool
+from core.metrics import instrument_engine
 
 load_dotenv()
 
@@ -12,17 +13,57 @@ POSTGRES_SERVER = os.getenv("POSTGRES_SERVER", "db")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "taskflow")
 
-SQLALCHEMY_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+def to_async_url(url: str) -> str:
+    """Map a plain database URL onto the async driver for its dialect."""
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SQLALCHEMY_DATABASE_URL = to_async_url(os.getenv(
+    "DATABASE_URL",
+    f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+))
+
+# Connection pool settings (per worker process)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+def pool_options(url: str) -> dict:
+    """Engine pool keyword arguments for the given database URL."""
+    if url.startswith("sqlite"):
+        # SQLite picks its own pool class; sizing options do not apply
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, **pool_options(SQLALCHEMY_DATABASE_URL))
+instrument_engine(engine.sync_engine)
+# expire_on_commit=False keeps loaded attributes usable after commit;
+# an expired attribute would otherwise trigger implicit IO during serialization.
+AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
+
+def get_session_factory():
+    """Session factory for responses that outlive get_db, such as streamed exports.
+
+    FastAPI closes yield dependencies before a StreamingResponse body is
+    sent, so a streaming handler opens its own session from this factory.
+    """
+    return AsyncSessionLocal
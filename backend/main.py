@@ -1,20 +1,51 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import time
+from fastapi.responses import JSONResponse, ORJSONResponse
+from contextlib import asynccontextmanager
+import os
 import logging
-from routers import auth, tasks, projects, health
+from core.cache import cache
+from core.compression import CompressionMiddleware
+from core.logging_config import start_logging, stop_logging
+from core.metrics import MetricsMiddleware, mark_process_dead
+from core.middleware import RateLimitMiddleware, RequestLoggingMiddleware, SecurityHeadersMiddleware
+from core.profiling import QueryProfilerMiddleware
+from core.redis_pool import redis_pool
+from routers import auth, tasks, projects, health, stats
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_logging()
+    await redis_pool.connect()
+    # Keep this worker's in-process cache coherent with writes made elsewhere
+    cache.start_listener()
+    yield
+    await cache.stop_listener()
+    await redis_pool.close()
+    mark_process_dead()
+    stop_logging()
+
 app = FastAPI(
     title="TaskFlow API",
     description="A modern task management application API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson encodes responses several times faster than the stdlib json module
+    default_response_class=ORJSONResponse,
 )
 
+# Innermost, so only application bodies are compressed and every header added
+# further out stays as is
+app.add_middleware(CompressionMiddleware)
+
+# Rate limiting (added before CORS so rejected requests still carry CORS headers)
+if os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true":
+    app.add_middleware(RateLimitMiddleware)
+
+app.add_middleware(SecurityHeadersMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,25 +53,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor",
+        "ETag",
+        "RateLimit-Limit",
+        "RateLimit-Remaining",
+        "RateLimit-Reset",
+        "RateLimit-Policy",
+        "Retry-After",
+    ],
 )
 
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    logger.info(
-        f"{request.method} {request.url.path} - "
-        f"Status: {response.status_code} - "
-        f"Duration: {process_time:.4f}s"
-    )
-    return response
+app.add_middleware(QueryProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+# Outermost, so the logged duration covers every other middleware
+app.add_middleware(RequestLoggingMiddleware)
 
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Global exception on {request.url.path}: {str(exc)}")
+    logger.error("unhandled exception", exc_info=exc, extra={"path": request.url.path})
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
@@ -51,6 +84,7 @@ app.include_router(health.router, tags=["Health"])
 app.include_router(auth.router, tags=["Authentication"])
 app.include_router(tasks.router, tags=["Tasks"])
 app.include_router(projects.router, tags=["Projects"])
+app.include_router(stats.router, tags=["Stats"])
 
 @app.get("/")
 async def root():
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Date, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import date, datetime
 
 Base = declarative_base()
 
@@ -37,6 +37,11 @@ class Project(Base):
     owner = relationship("User", back_populates="projects")
     tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Owner listings ordered/paged by (created_at, id)
+        Index("ix_projects_owner_id_created_at_id", "owner_id", "created_at", "id"),
+    )
+
 class Task(Base):
     __tablename__ = "tasks"
 
@@ -53,4 +58,44 @@ class Task(Base):
     
     # Relationships
     owner = relationship("User", back_populates="tasks")
-    project = relationship("Project", back_populates="tasks") 
\ No newline at end of file
+    project = relationship("Project", back_populates="tasks")
+
+    __table_args__ = (
+        # Owner listings ordered/paged by (created_at, id)
+        Index("ix_tasks_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        # Loading a project's tasks, scoped to their owner
+        Index("ix_tasks_project_id_owner_id", "project_id", "owner_id"),
+        # Listing filters: completed / priority in created_at order, due-date ranges and sort
+        Index("ix_tasks_owner_id_completed_created_at_id", "owner_id", "completed", "created_at", "id"),
+        Index("ix_tasks_owner_id_priority_created_at_id", "owner_id", "priority", "created_at", "id"),
+        Index("ix_tasks_owner_id_due_date_id", "owner_id", "due_date", "id"),
+        # Overdue: open tasks by due date; completed tasks never match, so leave them out
+        Index(
+            "ix_tasks_owner_id_due_date_open",
+            "owner_id",
+            "due_date",
+            postgresql_where=text("completed = false"),
+            sqlite_where=text("completed = 0"),
+        ),
+    ) 
+# Stand-ins for NULLs in TaskStat's primary key
+NO_PROJECT = 0
+NO_PRIORITY = ""
+NO_DUE_DATE = date(9999, 12, 31)
+
+class TaskStat(Base):
+    """Number of tasks per owner, project, priority, completion and due date.
+
+    Maintained by triggers on tasks (see core/stats.py and the Alembic
+    migration), so every write path keeps it current; the app only reads it.
+    """
+    __tablename__ = "task_stats"
+
+    owner_id = Column(Integer, primary_key=True)
+    project_key = Column(Integer, primary_key=True)
+    priority = Column(String, primary_key=True)
+    completed = Column(Boolean, primary_key=True)
+    # NO_DUE_DATE sorts after every real date, so it is never overdue; completed
+    # tasks always get it, so only open tasks' due dates add rows
+    due_key = Column(Date, primary_key=True)
+    task_count = Column(Integer, nullable=False, default=0)
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
-import redis
 import os
-from database import get_db
+from database import get_db, engine
+from core.db_pool import pool_status
+from core.cache import cache
+from core.metrics import CONTENT_TYPE_LATEST, metrics_payload
+from core.redis_pool import redis_pool
 
 router = APIRouter()
 
@@ -13,7 +16,7 @@ async def health_check():
     return {"status": "healthy", "service": "TaskFlow API"}
 
 @router.get("/health/detailed")
-async def detailed_health_check(db: Session = Depends(get_db)):
+async def detailed_health_check(db: AsyncSession = Depends(get_db)):
     """Detailed health check including database and cache connectivity."""
     health_status = {
         "status": "healthy",
@@ -29,35 +32,50 @@ async def detailed_health_check(db: Session = Depends(get_db)):
     
     # Check database connectivity
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         health_status["checks"]["database"] = "healthy"
     except Exception as e:
         health_status["checks"]["database"] = f"unhealthy: {str(e)}"
         health_status["status"] = "degraded"
     
-    # Check Redis connectivity
-    try:
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-        
-        # Skip Redis check if we're in testing environment
-        if is_testing:
-            health_status["checks"]["cache"] = "healthy (mocked for testing)"
-        else:
-            r = redis.from_url(redis_url)
-            r.ping()
-            health_status["checks"]["cache"] = "healthy"
-    except Exception as e:
-        # In testing, don't fail the health check for Redis connection issues
-        cache_error = f"unhealthy: {str(e)}"
-        health_status["checks"]["cache"] = cache_error
-        
-        # Only set status to degraded if we're not in a testing environment
-        if not is_testing:
-            health_status["status"] = "degraded"
+    # Check Redis connectivity through the shared pool
+    if is_testing:
+        health_status["checks"]["cache"] = "healthy (mocked for testing)"
+    elif await redis_pool.ping():
+        health_status["checks"]["cache"] = "healthy"
+    else:
+        health_status["checks"]["cache"] = f"unhealthy: circuit {redis_pool.breaker.state}"
+        health_status["status"] = "degraded"
     
     # Determine overall status - only fail if database is unhealthy
     if "unhealthy" in health_status["checks"]["database"]:
         health_status["status"] = "unhealthy"
         raise HTTPException(status_code=503, detail=health_status)
     
-    return health_status 
\ No newline at end of file
+    return health_status 
+
+@router.get("/health/pool")
+async def pool_health_check():
+    """Live connection pool statistics for this worker process."""
+    return {
+        "status": "healthy",
+        "service": "TaskFlow API",
+        "pid": os.getpid(),
+        "database_pool": pool_status(engine.sync_engine),
+    }
+
+@router.get("/health/cache")
+async def cache_health_check():
+    """Hit/miss/eviction counters of the in-process and Redis cache tiers."""
+    return {
+        "status": "healthy",
+        "service": "TaskFlow API",
+        "pid": os.getpid(),
+        "cache": cache.stats(),
+        "redis_pool": redis_pool.stats(),
+    }
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker, or all workers in multiprocess mode."""
+    return Response(metrics_payload(), media_type=CONTENT_TYPE_LATEST)
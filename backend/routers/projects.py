@@ -1,107 +1,360 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from core.cache import cache
-from database import get_db
-from models import Project, User
-from schemas.project import ProjectCreate, ProjectUpdate, Project as ProjectSchema
-from core.security import oauth2_scheme
-from core.security import verify_token
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from datetime import date
+from typing import List, Literal, Optional, Set, Tuple
+from core.cache import LIST_CACHE_STALE_TTL, LIST_CACHE_TTL, cache, user_namespace
+from core.conditional import none_match, not_modified, require_match, set_etag, version_etag
+from core.export import export_response
+from core.pagination import page_key_parts, paginate, set_next_cursor
+from core.serialization import dumps, encode_page, json_response, row_dicts, schema_columns
+from core.stats import load_task_stats, project_task_counts
+from database import get_db, get_session_factory
+from models import Project, Task
+from schemas.project import ProjectCreate, ProjectUpdate, ProjectHeader, ProjectSummary, Project as ProjectSchema
+from schemas.stats import TaskBreakdown
+from schemas.task import Task as TaskSchema
+from core.security import Principal, get_current_user
+from routers.tasks import owned_project_ids, parse_task_query, task_list_etag, task_page_response
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    payload = verify_token(token)
-    username = payload.get("sub")
-    if username is None:
-        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
-
-@router.post("/", response_model=ProjectSchema)
+PROJECT_FIELDS = set(ProjectSchema.model_fields)
+PROJECT_INCLUDES = {"tasks"}
+PROJECT_COUNT_FIELDS = {"task_count", "completed_count"}
+
+def _split_csv(value: Optional[str]) -> Set[str]:
+    return {part.strip() for part in (value or "").split(",") if part.strip()}
+
+def parse_project_fields(fields: Optional[str], include: Optional[str]) -> Tuple[Optional[Set[str]], bool]:
+    """Resolve ?fields= and ?include= into (selected fields or None, load tasks?)."""
+    selected = None
+    if fields is not None:
+        selected = _split_csv(fields)
+        unknown = selected - PROJECT_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    includes = _split_csv(include)
+    unknown = includes - PROJECT_INCLUDES
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+    if selected is not None and "tasks" in includes:
+        selected.add("tasks")
+    # Tasks are embedded only on request; by default projects carry their counts
+    load_tasks = "tasks" in includes or (selected is not None and "tasks" in selected)
+    return selected, load_tasks
+
+def wants_counts(selected: Optional[Set[str]]) -> bool:
+    return selected is None or bool(selected & PROJECT_COUNT_FIELDS)
+
+def project_query(load_tasks: bool):
+    query = select(Project)
+    if load_tasks:
+        # Loads the tasks of every project in the page with one extra
+        # SELECT ... WHERE project_id IN (...); an async session cannot
+        # lazy-load Project.tasks during serialization anyway.
+        query = query.options(selectinload(Project.tasks))
+    return query
+
+async def serialize_project(db: AsyncSession, project: Project, load_tasks: bool, load_counts: bool = True):
+    """The project as ProjectSummary, or as ProjectSchema with its tasks."""
+    schema = ProjectSchema if load_tasks else ProjectSummary
+    data = schema.model_validate(project)
+    if load_counts:
+        counts = await project_task_counts(db, project.owner_id, [project.id])
+        data = data.model_copy(update=counts[project.id])
+    return data
+
+def project_response(data: ProjectSummary, selected: Optional[Set[str]], headers: Optional[dict] = None):
+    """Encode a project, trimmed to the ?fields= selection if there is one."""
+    content = data.model_dump()
+    if selected is not None:
+        content = {key: content[key] for key in content if key in selected}
+    return json_response(dumps(content), headers)
+
+def fields_variant(selected: Optional[Set[str]], load_tasks: bool = False) -> str:
+    """Cache key part and ETag variant of a representation: summary, tasks or fields."""
+    if selected is not None:
+        return "fields:" + ",".join(sorted(selected))
+    return "tasks" if load_tasks else "summary"
+
+def project_etag(user_id: int, project_id: int, selected: Optional[Set[str]] = None, load_tasks: bool = False):
+    return version_etag(
+        user_namespace("projects", user_id), "project", project_id, variant=fields_variant(selected, load_tasks)
+    )
+
+async def get_owned_project(db: AsyncSession, project_id: int, owner_id: int, load_tasks: bool = True):
+    """Load a project of the given owner, or None."""
+    result = await db.execute(
+        project_query(load_tasks).where(Project.id == project_id, Project.owner_id == owner_id)
+    )
+    return result.scalars().first()
+
+@router.post("/", response_model=ProjectSummary)
 async def create_project(
     project: ProjectCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Create a new project."""
     db_project = Project(**project.model_dump(), owner_id=current_user.id)
     db.add(db_project)
-    db.commit()
-    db.refresh(db_project)
-    # Clear cache for user's projects
-    cache.clear_pattern(f"projects:user:{current_user.id}:*")
-    return db_project
+    await db.commit()
+    db_project = await get_owned_project(db, db_project.id, current_user.id, load_tasks=False)
+    # Invalidate cache for user's projects
+    await cache.invalidate(user_namespace("projects", current_user.id))
+    # A new project has no tasks, so its counts are known without asking
+    return ProjectSummary.model_validate(db_project)
 
-@router.get("/", response_model=List[ProjectSchema])
+# Plain columns in schema field order: rows encode straight to the JSON of
+# ProjectHeader (plus counts), and of Task for the embedded tasks
+PROJECT_COLUMNS = schema_columns(Project, ProjectHeader)
+PROJECT_TASK_COLUMNS = schema_columns(Task, TaskSchema)
+
+async def attach_tasks(db: AsyncSession, projects: List[dict], owner_id: int) -> None:
+    """Add each project's tasks with one SELECT ... WHERE project_id IN (...)."""
+    by_id = {project["id"]: project for project in projects}
+    for project in projects:
+        project["tasks"] = []
+    if not by_id:
+        return
+    result = await db.execute(
+        select(Task.project_id.label("_project_id"), *PROJECT_TASK_COLUMNS)
+        .where(Task.project_id.in_(by_id), Task.owner_id == owner_id)
+        .order_by(Task.id)
+    )
+    for task in row_dicts(result):
+        by_id[task.pop("_project_id")]["tasks"].append(task)
+
+@cache.cached(
+    lambda db, user_id, skip, limit, cursor, selected, load_tasks: cache.versioned_key(
+        user_namespace("projects", user_id),
+        *page_key_parts(skip, limit, cursor),
+        fields_variant(selected, load_tasks),
+    ),
+    expire=LIST_CACHE_TTL,
+    stale_ttl=LIST_CACHE_STALE_TTL,
+)
+async def load_project_page(
+    db: AsyncSession,
+    user_id: int,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    selected: Optional[Set[str]],
+    load_tasks: bool,
+):
+    """One page of a user's projects, encoded once; concurrent misses share one load."""
+    query = select(*PROJECT_COLUMNS).where(Project.owner_id == user_id)
+    projects = row_dicts(await db.execute(paginate(query, Project, skip, limit, cursor)))
+    if wants_counts(selected):
+        counts = await project_task_counts(db, user_id, [project["id"] for project in projects])
+        for project in projects:
+            project.update(counts[project["id"]])
+    if load_tasks:
+        await attach_tasks(db, projects, user_id)
+    body = None
+    if selected is not None:
+        body = ({key: project[key] for key in project if key in selected} for project in projects)
+    return await encode_page(projects, limit, body)
+
+@router.get("/", response_model=List[ProjectSummary])
 async def read_projects(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get all projects for current user.
+
+    Pages with skip/limit, or with the opaque cursor returned in the
+    X-Next-Cursor header of the previous page. Projects carry
+    ``task_count`` and ``completed_count``; their tasks are embedded only
+    with ``include=tasks`` (or paged through ``/projects/{id}/tasks``).
+    ``fields`` limits the response to a comma-separated set of fields.
+
+    Responses carry an ETag; a matching If-None-Match gets a 304 without
+    any query. Pages are cached as encoded JSON and sent as is.
+    """
+    selected, load_tasks = parse_project_fields(fields, include)
+    etag = await version_etag(
+        user_namespace("projects", current_user.id),
+        "list",
+        *page_key_parts(skip, limit, cursor),
+        variant=fields_variant(selected, load_tasks),
+    )
+    if none_match(if_none_match, etag):
+        return not_modified(etag)
+    page = await load_project_page(db, current_user.id, skip, limit, cursor, selected, load_tasks)
+    set_next_cursor(response, page["next_cursor"])
+    set_etag(response, etag)
+    return json_response(page["body"], dict(response.headers), page["encoded"])
+
+PROJECT_EXPORT_COLUMNS = list(ProjectHeader.model_fields)
+
+@router.get("/export")
+async def export_projects(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    session_factory=Depends(get_session_factory),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get all projects for current user."""
-    cache_key = f"projects:user:{current_user.id}:{skip}:{limit}"
-    cached_projects = cache.get(cache_key)
-    if cached_projects:
-        return cached_projects
-    
-    projects = db.query(Project).filter(Project.owner_id == current_user.id).offset(skip).limit(limit).all()
-    # Convert to schema objects for proper serialization
-    project_list = [ProjectSchema.model_validate(project) for project in projects]
-    # Convert to dict for caching
-    project_dicts = [project.model_dump() for project in project_list]
-    cache.set(cache_key, project_dicts)
-    return project_list
-
-@router.get("/{project_id}", response_model=ProjectSchema)
+    """Stream all of the user's projects as NDJSON or CSV, oldest first.
+
+    Tasks are not embedded; ``/tasks/export`` carries their ``project_id``.
+    """
+    query = (
+        select(*(getattr(Project, column) for column in PROJECT_EXPORT_COLUMNS))
+        .where(Project.owner_id == current_user.id)
+        .order_by(Project.created_at, Project.id)
+    )
+    return export_response(session_factory, query, PROJECT_EXPORT_COLUMNS, format, "projects")
+
+@router.get("/{project_id}", response_model=ProjectSummary)
 async def read_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get a specific project."""
-    project = db.query(Project).filter(Project.id == project_id, Project.owner_id == current_user.id).first()
+    """Get a specific project, with its tasks only if ``include=tasks``.
+
+    A matching If-None-Match gets a 304 without any query.
+    """
+    selected, load_tasks = parse_project_fields(fields, include)
+    etag = await project_etag(current_user.id, project_id, selected, load_tasks)
+    if none_match(if_none_match, etag):
+        return not_modified(etag)
+    project = await get_owned_project(db, project_id, current_user.id, load_tasks)
     if project is None:
         raise HTTPException(status_code=404, detail="Project not found")
-    return project
+    set_etag(response, etag)
+    data = await serialize_project(db, project, load_tasks, wants_counts(selected))
+    return project_response(data, selected, dict(response.headers))
+
+@router.get("/{project_id}/stats", response_model=TaskBreakdown)
+async def read_project_stats(
+    project_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Task counts of a project by completion, priority and overdue status.
+
+    Read from the task_stats rollup, whose rows are bounded by the distinct
+    due dates of open tasks rather than by the number of tasks.
+    """
+    today = date.today()
+    etag = await version_etag(user_namespace("tasks", current_user.id), "project-stats", project_id, today)
+    if none_match(if_none_match, etag):
+        return not_modified(etag)
+    if not await owned_project_ids(db, {project_id}, current_user.id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    stats = await load_task_stats(db, current_user.id, today, project_id)
+    set_etag(response, etag)
+    return stats
 
-@router.put("/{project_id}", response_model=ProjectSchema)
+@router.get("/{project_id}/tasks", response_model=List[TaskSchema])
+async def read_project_tasks(
+    project_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    completed: Optional[bool] = None,
+    priority: Optional[str] = None,
+    due_after: Optional[date] = None,
+    due_before: Optional[date] = None,
+    overdue: bool = False,
+    sort: str = "created_at",
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """A project's tasks, paged and filtered like GET /tasks.
+
+    Pages are cached and tagged with the same keys as the equivalent
+    ``/tasks?project_id=`` request, so either URL warms the other.
+    """
+    filters = parse_task_query(completed, priority, project_id, due_after, due_before, overdue, sort)
+    etag = await task_list_etag(current_user.id, skip, limit, cursor, filters)
+    if none_match(if_none_match, etag):
+        return not_modified(etag)
+    if not await owned_project_ids(db, {project_id}, current_user.id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return await task_page_response(db, current_user.id, response, etag, skip, limit, cursor, filters)
+
+@router.put("/{project_id}", response_model=ProjectSummary)
 async def update_project(
     project_id: int,
     project_update: ProjectUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Update a project."""
-    db_project = db.query(Project).filter(Project.id == project_id, Project.owner_id == current_user.id).first()
+    """Update a project with a single UPDATE ... RETURNING (plus its task counts).
+
+    With If-Match, the update only happens if none of the user's projects
+    (or their tasks) has changed since the ETag was issued (412 otherwise).
+    """
+    if if_match is not None:
+        require_match(if_match, await project_etag(current_user.id, project_id))
+    owned = (Project.id == project_id, Project.owner_id == current_user.id)
+    update_data = project_update.model_dump(exclude_unset=True)
+    if not update_data:
+        db_project = await get_owned_project(db, project_id, current_user.id, load_tasks=False)
+        if db_project is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return await serialize_project(db, db_project, load_tasks=False)
+
+    db_project = (await db.scalars(
+        update(Project)
+        .where(*owned)
+        .values(**update_data)
+        .returning(Project),
+        execution_options={"synchronize_session": False},
+    )).first()
     if db_project is None:
         raise HTTPException(status_code=404, detail="Project not found")
-    
-    update_data = project_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_project, field, value)
-    
-    db.commit()
-    db.refresh(db_project)
-    # Clear cache for user's projects
-    cache.clear_pattern(f"projects:user:{current_user.id}:*")
-    return db_project
+    await db.commit()
+    # Invalidate cache for user's projects
+    await cache.invalidate(user_namespace("projects", current_user.id))
+    return await serialize_project(db, db_project, load_tasks=False)
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Delete a project."""
-    db_project = db.query(Project).filter(Project.id == project_id, Project.owner_id == current_user.id).first()
-    if db_project is None:
+    """Delete a project and its tasks without loading either."""
+    owned_project = select(Project.id).where(
+        Project.id == project_id, Project.owner_id == current_user.id
+    )
+    # Same effect as the ORM delete-orphan cascade on Project.tasks
+    await db.execute(
+        delete(Task)
+        .where(Task.project_id.in_(owned_project.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        delete(Project)
+        .where(Project.id == project_id, Project.owner_id == current_user.id)
+        .returning(Project.id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.scalar() is None:
         raise HTTPException(status_code=404, detail="Project not found")
-    
-    db.delete(db_project)
-    db.commit()
-    # Clear cache for user's projects
-    cache.clear_pattern(f"projects:user:{current_user.id}:*") 
\ No newline at end of file
+    await db.commit()
+    # The project's tasks went with it, so both listings change
+    await cache.invalidate(user_namespace("projects", current_user.id))
+    await cache.invalidate(user_namespace("tasks", current_user.id))
@@ -0,0 +1,32 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.cache import user_namespace
+from core.conditional import none_match, not_modified, set_etag, version_etag
+from core.security import Principal, get_current_user
+from core.stats import load_task_stats
+from database import get_db
+from schemas.stats import UserStats
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+@router.get("/", response_model=UserStats)
+async def read_stats(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Task counts for the dashboard: by completion, priority and overdue status, per project.
+
+    Read from the task_stats rollup, whose rows are bounded by the distinct
+    due dates of open tasks rather than by the number of tasks.
+    """
+    today = date.today()
+    etag = await version_etag(user_namespace("tasks", current_user.id), "stats", today)
+    if none_match(if_none_match, etag):
+        return not_modified(etag)
+    stats = await load_task_stats(db, current_user.id, today)
+    set_etag(response, etag)
+    return stats
@@ -1,107 +1,518 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from core.cache import cache
-from database import get_db
-from models import Task, User
-from schemas.task import TaskCreate, TaskUpdate, Task as TaskSchema
-from core.security import oauth2_scheme
-from core.security import verify_token
+from dataclasses import dataclass, fields
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from pydantic import ValidationError
+from sqlalchemy import case, delete, false, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Set, Tuple
+from urllib.parse import urlencode
+from core.cache import LIST_CACHE_STALE_TTL, LIST_CACHE_TTL, cache, user_namespace
+from core.conditional import none_match, not_modified, require_match, set_etag, version_etag
+from core.export import export_response
+from core.importing import (
+    IMPORT_CHUNK_SIZE,
+    IMPORT_MAX_ERRORS,
+    ImportLineError,
+    chunked,
+    copy_rows,
+    csv_records,
+    iter_lines,
+    ndjson_records,
+)
+from core.pagination import page_key_parts, paginate, paginate_sorted, set_next_cursor
+from core.search import search_tasks
+from core.serialization import encode_page, json_response, row_dicts, schema_columns
+from database import get_db, get_session_factory
+from models import Project, Task
+from schemas.task import (
+    BulkItemError,
+    ImportChunkProgress,
+    ImportLineError as ImportLineErrorSchema,
+    TaskBulkCreate,
+    TaskBulkDelete,
+    TaskBulkDeleteResult,
+    TaskBulkResult,
+    TaskBulkUpdate,
+    TaskCreate,
+    TaskImportResult,
+    TaskSearchResult,
+    TaskUpdate,
+    Task as TaskSchema,
+)
+from core.security import Principal, get_current_user
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    payload = verify_token(token)
-    username = payload.get("sub")
-    if username is None:
-        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
+async def invalidate_task_caches(user_id: int) -> None:
+    # Invalidate cache for user's tasks and the projects that embed them
+    await cache.invalidate(user_namespace("tasks", user_id))
+    await cache.invalidate(user_namespace("projects", user_id))
 
 @router.post("/", response_model=TaskSchema)
 async def create_task(
     task: TaskCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """Create a new task."""
     db_task = Task(**task.model_dump(), owner_id=current_user.id)
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-    # Clear cache for user's tasks
-    cache.clear_pattern(f"tasks:user:{current_user.id}:*")
+    await db.commit()
+    await db.refresh(db_task)
+    await invalidate_task_caches(current_user.id)
     return db_task
 
+# Semantic order for sort=priority: High first
+PRIORITY_RANK = case({"High": 0, "Medium": 1, "Low": 2}, value=Task.priority, else_=3)
+# Whitelisted sort keys; None means the keyset (created_at, id) order
+TASK_SORTS = {
+    "created_at": None,
+    "updated_at": (Task.updated_at,),
+    "due_date": (Task.due_date,),
+    "priority": (PRIORITY_RANK,),
+    "title": (Task.title,),
+}
+
+@dataclass(frozen=True)
+class TaskListQuery:
+    """Normalized filters and sort of a task listing.
+
+    Equivalent requests (e.g. ``priority=Low,High`` and ``priority=High,Low``)
+    normalize to equal instances and therefore share one cache entry.
+    """
+    completed: Optional[bool] = None
+    priorities: Tuple[str, ...] = ()
+    project_id: Optional[int] = None
+    due_after: Optional[date] = None
+    due_before: Optional[date] = None
+    # The day "overdue" was evaluated for, so cached pages roll over at midnight
+    overdue_on: Optional[date] = None
+    sort: str = "created_at"
+    descending: bool = False
+
+    @property
+    def keyset(self) -> bool:
+        return TASK_SORTS[self.sort] is None
+
+    def key(self) -> str:
+        """Canonical cache key part; only non-default values are included.
+
+        Values are URL-encoded, so one containing ``&`` or ``=`` cannot pass
+        for another filter.
+        """
+        parts = []
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if value != field.default:
+                if isinstance(value, tuple):
+                    value = ",".join(value)
+                parts.append((field.name, str(value)))
+        return urlencode(parts) or "all"
+
+    def where(self, query):
+        if self.completed is not None:
+            query = query.where(Task.completed == self.completed)
+        if self.priorities:
+            query = query.where(Task.priority.in_(self.priorities))
+        if self.project_id is not None:
+            query = query.where(Task.project_id == self.project_id)
+        if self.due_after is not None:
+            query = query.where(Task.due_date >= self.due_after)
+        if self.due_before is not None:
+            query = query.where(Task.due_date <= self.due_before)
+        if self.overdue_on is not None:
+            # Same predicate as the partial index ix_tasks_owner_id_due_date_open
+            query = query.where(Task.completed == false(), Task.due_date < self.overdue_on)
+        return query
+
+    def page(self, query, skip: int, limit: int, cursor: Optional[str]):
+        if self.keyset:
+            return paginate(query, Task, skip, limit, cursor, descending=self.descending)
+        return paginate_sorted(query, Task, TASK_SORTS[self.sort], self.descending, skip, limit, cursor)
+
+def parse_task_query(
+    completed: Optional[bool],
+    priority: Optional[str],
+    project_id: Optional[int],
+    due_after: Optional[date],
+    due_before: Optional[date],
+    overdue: bool,
+    sort: str,
+) -> TaskListQuery:
+    """Validate listing query parameters into a TaskListQuery."""
+    descending = sort.startswith("-")
+    sort_key = sort.lstrip("-")
+    if sort_key not in TASK_SORTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown sort: {sort_key}. Use one of {', '.join(TASK_SORTS)}, optionally prefixed with '-'",
+        )
+    priorities = {part.strip() for part in (priority or "").split(",") if part.strip()}
+    return TaskListQuery(
+        completed=completed,
+        priorities=tuple(sorted(priorities)),
+        project_id=project_id,
+        due_after=due_after,
+        due_before=due_before,
+        overdue_on=date.today() if overdue else None,
+        sort=sort_key,
+        descending=descending,
+    )
+
+# Plain columns in TaskSchema's field order: rows encode straight to its JSON
+TASK_COLUMNS = schema_columns(Task, TaskSchema)
+
+@cache.cached(
+    lambda db, user_id, skip, limit, cursor, filters: cache.versioned_key(
+        user_namespace("tasks", user_id), *page_key_parts(skip, limit, cursor), filters.key()
+    ),
+    expire=LIST_CACHE_TTL,
+    stale_ttl=LIST_CACHE_STALE_TTL,
+)
+async def load_task_page(
+    db: AsyncSession, user_id: int, skip: int, limit: int, cursor: Optional[str], filters: TaskListQuery
+):
+    """One page of a user's tasks, encoded once; concurrent misses share one query."""
+    query = filters.where(select(*TASK_COLUMNS).where(Task.owner_id == user_id))
+    result = await db.execute(filters.page(query, skip, limit, cursor))
+    return await encode_page(row_dicts(result), limit)
+
+def task_list_etag(user_id: int, skip: int, limit: int, cursor: Optional[str], filters: TaskListQuery):
+    # Read the version before the data, so a concurrent write can only make the tag older
+    return version_etag(user_namespace("tasks", user_id), "list", *page_key_parts(skip, limit, cursor), filters.key())
+
+async def task_page_response(
+    db: AsyncSession,
+    user_id: int,
+    response: Response,
+    etag: Optional[str],
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    filters: TaskListQuery,
+):
+    """Send a (cached) page of tasks with its cursor and ETag headers."""
+    page = await load_task_page(db, user_id, skip, limit, cursor, filters)
+    if filters.keyset:
+        set_next_cursor(response, page["next_cursor"])
+    set_etag(response, etag)
+    return json_response(page["body"], dict(response.headers), page["encoded"])
+
 @router.get("/", response_model=List[TaskSchema])
 async def read_tasks(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    completed: Optional[bool] = None,
+    priority: Optional[str] = None,
+    project_id: Optional[int] = None,
+    due_after: Optional[date] = None,
+    due_before: Optional[date] = None,
+    overdue: bool = False,
+    sort: str = "created_at",
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Get all tasks for current user.
+
+    Filters: ``completed``, ``priority`` (comma-separated), ``project_id``,
+    ``due_after``/``due_before`` (inclusive) and ``overdue`` (open tasks due
+    before today). ``sort`` is one of created_at, updated_at, due_date,
+    priority or title, prefixed with ``-`` for descending order.
+
+    Pages with skip/limit, or, when sorting by created_at, with the opaque
+    cursor returned in the X-Next-Cursor header of the previous page.
+
+    Responses carry an ETag; a matching If-None-Match gets a 304 without
+    any query. Pages are cached as encoded JSON and sent as is.
+    """
+    filters = parse_task_query(completed, priority, project_id, due_after, due_before, overdue, sort)
+    etag = await task_list_etag(current_user.id, skip, limit, cursor, filters)
+    if none_match(if_none_match, etag):
+        return not_modified(etag)
+    return await task_page_response(db, current_user.id, response, etag, skip, limit, cursor, filters)
+
+async def owned_project_ids(db: AsyncSession, project_ids: Set[int], owner_id: int) -> Set[int]:
+    """The subset of project_ids that exist and belong to owner_id."""
+    if not project_ids:
+        return set()
+    result = await db.execute(
+        select(Project.id).where(Project.id.in_(project_ids), Project.owner_id == owner_id)
+    )
+    return set(result.scalars())
+
+@router.post("/bulk", response_model=TaskBulkResult)
+async def create_tasks_bulk(
+    batch: TaskBulkCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Create many tasks with one multi-row INSERT ... RETURNING.
+
+    Invalid items and items pointing at a project the user does not own are
+    reported in ``failed`` by their index; the rest are created.
+    """
+    failed, valid = [], []
+    for index, item in enumerate(batch.items):
+        try:
+            valid.append((index, TaskCreate.model_validate(item)))
+        except ValidationError as exc:
+            detail = exc.errors(include_url=False, include_context=False, include_input=False)
+            failed.append(BulkItemError(index=index, detail=detail))
+
+    projects = await owned_project_ids(
+        db, {task.project_id for _, task in valid if task.project_id is not None}, current_user.id
+    )
+    rows = []
+    for index, task in valid:
+        if task.project_id is not None and task.project_id not in projects:
+            failed.append(BulkItemError(index=index, detail="Project not found"))
+        else:
+            rows.append({**task.model_dump(), "owner_id": current_user.id})
+
+    created = []
+    if rows:
+        created = list(await db.scalars(insert(Task).returning(Task), rows))
+        await db.commit()
+        await invalidate_task_caches(current_user.id)
+    failed.sort(key=lambda error: error.index)
+    return TaskBulkResult(succeeded=created, failed=failed)
+
+@router.patch("/bulk", response_model=TaskBulkResult)
+async def update_tasks_bulk(
+    batch: TaskBulkUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get all tasks for current user."""
-    cache_key = f"tasks:user:{current_user.id}:{skip}:{limit}"
-    cached_tasks = cache.get(cache_key)
-    if cached_tasks:
-        return cached_tasks
-    
-    tasks = db.query(Task).filter(Task.owner_id == current_user.id).offset(skip).limit(limit).all()
-    # Convert to schema objects for proper serialization
-    task_list = [TaskSchema.model_validate(task) for task in tasks]
-    # Convert to dict for caching
-    task_dicts = [task.model_dump() for task in task_list]
-    cache.set(cache_key, task_dicts)
-    return task_list
+    """Apply one update to many tasks with a single UPDATE ... WHERE id IN.
+
+    Ids that do not exist or belong to someone else are reported in ``failed``.
+    """
+    ids = list(dict.fromkeys(batch.ids))
+    update_data = batch.update.model_dump(exclude_unset=True)
+    project_id = update_data.get("project_id")
+    if project_id is not None and not await owned_project_ids(db, {project_id}, current_user.id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    owned = (Task.owner_id == current_user.id, Task.id.in_(ids))
+    if update_data:
+        statement = update(Task).where(*owned).values(**update_data).returning(Task)
+        updated = list(await db.scalars(
+            statement, execution_options={"synchronize_session": False}
+        ))
+        await db.commit()
+        if updated:
+            await invalidate_task_caches(current_user.id)
+    else:
+        updated = list(await db.scalars(select(Task).where(*owned)))
+
+    position = {task_id: index for index, task_id in enumerate(ids)}
+    found = {task.id for task in updated}
+    updated.sort(key=lambda task: position[task.id])
+    failed = [BulkItemError(id=task_id, detail="Task not found") for task_id in ids if task_id not in found]
+    return TaskBulkResult(succeeded=updated, failed=failed)
+
+@router.delete("/bulk", response_model=TaskBulkDeleteResult)
+async def delete_tasks_bulk(
+    batch: TaskBulkDelete,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Delete many tasks with a single DELETE ... WHERE id IN."""
+    ids = list(dict.fromkeys(batch.ids))
+    result = await db.execute(
+        delete(Task)
+        .where(Task.owner_id == current_user.id, Task.id.in_(ids))
+        .returning(Task.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = set(result.scalars())
+    await db.commit()
+    if deleted:
+        await invalidate_task_caches(current_user.id)
+    return TaskBulkDeleteResult(
+        deleted=[task_id for task_id in ids if task_id in deleted],
+        failed=[BulkItemError(id=task_id, detail="Task not found") for task_id in ids if task_id not in deleted],
+    )
+
+@router.post("/import", response_model=TaskImportResult)
+async def import_tasks(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Import tasks from an NDJSON or CSV request body.
+
+    The body is parsed as it arrives and handled in chunks of
+    IMPORT_CHUNK_SIZE records: each chunk is validated against TaskCreate,
+    checked for project ownership with one query, written with COPY (or an
+    executemany INSERT outside Postgres) and committed. Invalid lines are
+    reported by line number and skipped.
+    """
+    records = (ndjson_records if format == "ndjson" else csv_records)(iter_lines(request.stream()))
+    result = TaskImportResult(imported=0, failed=0)
+
+    def reject(line, detail):
+        result.failed += 1
+        if len(result.errors) < IMPORT_MAX_ERRORS:
+            result.errors.append(ImportLineErrorSchema(line=line, detail=detail))
+
+    number = 0
+    async for chunk in chunked(records, IMPORT_CHUNK_SIZE):
+        number += 1
+        failed_before = result.failed
+        valid = []
+        for line, record in chunk:
+            if isinstance(record, ImportLineError):
+                reject(line, str(record))
+                continue
+            try:
+                valid.append((line, TaskCreate.model_validate(record)))
+            except ValidationError as exc:
+                reject(line, exc.errors(include_url=False, include_context=False, include_input=False))
+
+        projects = await owned_project_ids(
+            db, {task.project_id for _, task in valid if task.project_id is not None}, current_user.id
+        )
+        # COPY skips column defaults, so every row carries its timestamps
+        now = datetime.utcnow()
+        rows = []
+        for line, task in valid:
+            if task.project_id is not None and task.project_id not in projects:
+                reject(line, "Project not found")
+            else:
+                rows.append({**task.model_dump(), "owner_id": current_user.id, "created_at": now, "updated_at": now})
+        await copy_rows(db, Task.__table__, rows)
+        await db.commit()
+
+        result.imported += len(rows)
+        result.chunks.append(ImportChunkProgress(
+            chunk=number,
+            first_line=chunk[0][0],
+            last_line=chunk[-1][0],
+            imported=len(rows),
+            failed=result.failed - failed_before,
+        ))
+
+    if result.imported:
+        await invalidate_task_caches(current_user.id)
+    result.errors.sort(key=lambda error: error.line)
+    return result
+
+@router.get("/search", response_model=List[TaskSearchResult])
+async def search_user_tasks(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Full-text search over the user's task titles and descriptions.
+
+    Results are ordered by relevance, title matches first, with the
+    matched terms highlighted.
+    """
+    rows = await search_tasks(db, current_user.id, q, limit, skip)
+    return [
+        TaskSearchResult(
+            **TaskSchema.model_validate(task).model_dump(),
+            rank=rank,
+            title_highlight=title,
+            description_highlight=description or None,
+        )
+        for task, rank, title, description in rows
+    ]
+
+TASK_EXPORT_COLUMNS = list(TaskSchema.model_fields)
+
+@router.get("/export")
+async def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    session_factory=Depends(get_session_factory),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Stream all of the user's tasks as NDJSON or CSV, oldest first."""
+    query = (
+        select(*(getattr(Task, column) for column in TASK_EXPORT_COLUMNS))
+        .where(Task.owner_id == current_user.id)
+        .order_by(Task.created_at, Task.id)
+    )
+    return export_response(session_factory, query, TASK_EXPORT_COLUMNS, format, "tasks")
+
+def task_etag(user_id: int, task_id: int):
+    return version_etag(user_namespace("tasks", user_id), "task", task_id)
 
 @router.get("/{task_id}", response_model=TaskSchema)
 async def read_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Get a specific task."""
-    task = db.query(Task).filter(Task.id == task_id, Task.owner_id == current_user.id).first()
+    """Get a specific task; a matching If-None-Match gets a 304 without any query."""
+    etag = await task_etag(current_user.id, task_id)
+    if none_match(if_none_match, etag):
+        return not_modified(etag)
+    result = await db.execute(
+        select(Task).where(Task.id == task_id, Task.owner_id == current_user.id)
+    )
+    task = result.scalars().first()
     if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
+    set_etag(response, etag)
     return task
 
 @router.put("/{task_id}", response_model=TaskSchema)
 async def update_task(
     task_id: int,
     task_update: TaskUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Update a task."""
-    db_task = db.query(Task).filter(Task.id == task_id, Task.owner_id == current_user.id).first()
+    """Update a task with a single UPDATE ... RETURNING.
+
+    With If-Match, the update only happens if none of the user's tasks has
+    changed since the ETag was issued (412 otherwise).
+    """
+    if if_match is not None:
+        require_match(if_match, await task_etag(current_user.id, task_id))
+    owned = (Task.id == task_id, Task.owner_id == current_user.id)
+    update_data = task_update.model_dump(exclude_unset=True)
+    if not update_data:
+        db_task = (await db.scalars(select(Task).where(*owned))).first()
+        if db_task is None:
+            raise HTTPException(status_code=404, detail="Task not found")
+        return db_task
+
+    db_task = (await db.scalars(
+        update(Task).where(*owned).values(**update_data).returning(Task),
+        execution_options={"synchronize_session": False},
+    )).first()
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    update_data = task_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_task, field, value)
-    
-    db.commit()
-    db.refresh(db_task)
-    # Clear cache for user's tasks
-    cache.clear_pattern(f"tasks:user:{current_user.id}:*")
+    await db.commit()
+    await invalidate_task_caches(current_user.id)
     return db_task
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task(
     task_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Delete a task."""
-    db_task = db.query(Task).filter(Task.id == task_id, Task.owner_id == current_user.id).first()
-    if db_task is None:
+    """Delete a task with a single DELETE ... RETURNING."""
+    result = await db.execute(
+        delete(Task)
+        .where(Task.id == task_id, Task.owner_id == current_user.id)
+        .returning(Task.id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.scalar() is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    
-    db.delete(db_task)
-    db.commit()
-    # Clear cache for user's tasks
-    cache.clear_pattern(f"tasks:user:{current_user.id}:*") 
\ No newline at end of file
+    await db.commit()
+    await invalidate_task_caches(current_user.id)
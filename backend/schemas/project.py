@@ -20,12 +20,21 @@ class ProjectUpdate(BaseModel):
     start_date: Optional[date] = None
     end_date: Optional[date] = None
 
-class Project(ProjectBase):
+class ProjectHeader(ProjectBase):
+    """Project without its tasks, for listings that do not need them."""
     id: int
     owner_id: int
     created_at: datetime
     updated_at: datetime
-    tasks: List[Task] = []
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class ProjectSummary(ProjectHeader):
+    """Project with task counts in place of its tasks (see /projects/{id}/tasks)."""
+    task_count: int = 0
+    completed_count: int = 0
+
+class Project(ProjectSummary):
+    """Project with its tasks embedded, as requested with include=tasks."""
+    tasks: List[Task] = [] 
\ No newline at end of file
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+class TaskCounts(BaseModel):
+    total: int = 0
+    completed: int = 0
+    open: int = 0
+    # Open tasks due before today
+    overdue: int = 0
+    completion_rate: float = 0.0
+
+class TaskBreakdown(TaskCounts):
+    # Keyed by priority; "none" for tasks without one
+    by_priority: Dict[str, TaskCounts] = {}
+
+class ProjectStats(TaskBreakdown):
+    # None for the tasks that belong to no project
+    project_id: Optional[int] = None
+
+class UserStats(TaskBreakdown):
+    # Only projects with at least one task
+    projects: List[ProjectStats] = []
@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime, date
-from typing import Optional
+from typing import Any, Dict, List, Optional
+
+# Largest batch accepted by the /tasks/bulk endpoints
+BULK_MAX_ITEMS = 500
 
 class TaskBase(BaseModel):
     title: str
@@ -31,4 +34,52 @@ class Task(TaskBase):
         from_attributes = True
         json_encoders = {
             datetime: lambda v: v.isoformat()
-        } 
\ No newline at end of file
+        }
+
+class TaskBulkCreate(BaseModel):
+    # Items are validated one by one against TaskCreate so a bad item is
+    # reported on its own instead of rejecting the whole batch
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class TaskBulkUpdate(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+    update: TaskUpdate
+
+class TaskBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class BulkItemError(BaseModel):
+    index: Optional[int] = None
+    id: Optional[int] = None
+    detail: Any
+
+class TaskBulkResult(BaseModel):
+    succeeded: List[Task]
+    failed: List[BulkItemError] = []
+
+class TaskBulkDeleteResult(BaseModel):
+    deleted: List[int]
+    failed: List[BulkItemError] = []
+
+class ImportLineError(BaseModel):
+    line: int
+    detail: Any
+
+class ImportChunkProgress(BaseModel):
+    chunk: int
+    first_line: int
+    last_line: int
+    imported: int
+    failed: int
+
+class TaskImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportLineError] = []
+    chunks: List[ImportChunkProgress] = []
+
+class TaskSearchResult(Task):
+    rank: float
+    # Matched terms wrapped in <mark>...</mark>
+    title_highlight: Optional[str] = None
+    description_highlight: Optional[str] = None
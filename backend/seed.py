@@ -73,10 +73,13 @@ def seed_database(db: Session):
         db.commit()
 
 if __name__ == "__main__":
-    from database import SessionLocal
-    db = SessionLocal()
-    try:
-        seed_database(db)
+    import asyncio
+    from database import AsyncSessionLocal
+
+    async def main():
+        async with AsyncSessionLocal() as db:
+            # seed_database is plain ORM code; run it on the session's sync facade
+            await db.run_sync(seed_database)
         print("Database seeded successfully!")
-    finally:
-        db.close() 
\ No newline at end of file
+
+    asyncio.run(main())
@@ -55,4 +55,28 @@ def test_login_nonexistent_user(client):
         "/auth/token",
         data={"username": "nonexistent", "password": "password123"}
     )
-    assert response.status_code == status.HTTP_401_UNAUTHORIZED 
\ No newline at end of file
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_authenticated_requests_reuse_cached_user(client, auth_headers, sql_statements):
+    """Test that only the first request resolves the user from the database."""
+    client.get("/tasks", headers=auth_headers)
+    client.get("/projects", headers=auth_headers)
+    user_queries = [s for s in sql_statements if "FROM users" in s]
+    assert len(user_queries) == 1
+
+def test_deactivated_user_is_rejected(client, auth_headers, test_user, async_session_factory):
+    """Test that deactivating a user invalidates their cached principal."""
+    import asyncio
+    from core.security import deactivate_user
+    from models import User
+
+    assert client.get("/tasks", headers=auth_headers).status_code == status.HTTP_200_OK
+
+    async def deactivate():
+        async with async_session_factory() as db:
+            user = await db.get(User, test_user.id)
+            await deactivate_user(db, user)
+
+    asyncio.run(deactivate())
+    response = client.get("/tasks", headers=auth_headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
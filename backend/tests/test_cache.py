@@ -0,0 +1,306 @@
+import asyncio
+import pytest
+from core.cache import MockRedisCache, user_namespace
+
+def test_invalidate_orphans_namespace_entries():
+    """Test that invalidation moves a namespace to a new generation."""
+    cache = MockRedisCache()
+    namespace = user_namespace("tasks", 1)
+
+    async def run():
+        key = await cache.versioned_key(namespace, 0, 100)
+        await cache.set(key, [{"id": 1}])
+        assert await cache.get(await cache.versioned_key(namespace, 0, 100)) == [{"id": 1}]
+
+        await cache.invalidate(namespace)
+
+        new_key = await cache.versioned_key(namespace, 0, 100)
+        assert new_key != key
+        assert await cache.get(new_key) is None
+
+    asyncio.run(run())
+
+def test_invalidate_leaves_other_namespaces_alone():
+    """Test that generations are tracked per user and resource."""
+    cache = MockRedisCache()
+
+    async def keys():
+        return [
+            await cache.versioned_key(user_namespace("tasks", 1), 0, 100),
+            await cache.versioned_key(user_namespace("tasks", 2), 0, 100),
+            await cache.versioned_key(user_namespace("projects", 1), 0, 100),
+        ]
+
+    tasks_key, other_user_key, projects_key = asyncio.run(keys())
+    asyncio.run(cache.invalidate(user_namespace("tasks", 1)))
+    new_tasks_key, new_other_user_key, new_projects_key = asyncio.run(keys())
+
+    assert new_tasks_key != tasks_key
+    assert new_other_user_key == other_user_key
+    assert new_projects_key == projects_key
+
+def test_task_write_invalidates_cached_list(client, auth_headers):
+    """Test that a cached task list is not served after a write."""
+    client.post("/tasks", json={"title": "First"}, headers=auth_headers)
+    assert len(client.get("/tasks", headers=auth_headers).json()) == 1
+    client.post("/tasks", json={"title": "Second"}, headers=auth_headers)
+    titles = [t["title"] for t in client.get("/tasks", headers=auth_headers).json()]
+    assert titles == ["First", "Second"]
+
+def _tiered(**local_options):
+    from core.cache import LocalLRUCache, TieredCache
+
+    return TieredCache(remote=MockRedisCache(), local=LocalLRUCache(**local_options))
+
+def test_tiered_cache_serves_hits_from_local_tier():
+    """Test that a value read once is served from L1 afterwards."""
+    cache = _tiered()
+    asyncio.run(cache.set("key", {"a": 1}))
+    cache.local.clear()
+
+    assert asyncio.run(cache.get("key")) == {"a": 1}
+    assert asyncio.run(cache.get("key")) == {"a": 1}
+    stats = cache.stats()
+    assert stats["l2"]["hits"] == 1
+    assert stats["l1"]["hits"] == 1
+
+def test_local_tier_respects_entry_and_byte_budgets():
+    """Test LRU eviction by entry count and by byte size."""
+    from core.cache import LocalLRUCache
+
+    local = LocalLRUCache(max_entries=2, max_bytes=100)
+    local.set("a", 1, size=10)
+    local.set("b", 2, size=10)
+    local.get("a")
+    local.set("c", 3, size=10)
+    assert local.get("b") is None
+    assert local.get("a") == 1
+
+    local.set("big", 4, size=90)
+    assert local.stats()["bytes"] <= 100
+    assert local.stats()["evictions"] == 2
+
+def test_local_tier_expires_entries():
+    """Test that L1 entries expire after their TTL."""
+    from core.cache import LocalLRUCache
+
+    local = LocalLRUCache(ttl=0)
+    local.set("a", 1)
+    assert local.get("a") is None
+
+def test_invalidation_messages_drop_local_copies():
+    """Test that another worker's invalidation clears this worker's L1."""
+    cache = _tiered()
+    namespace = user_namespace("tasks", 1)
+
+    async def run():
+        key = await cache.versioned_key(namespace, 0, 100)
+        await cache.set(key, [1])
+
+        # Another worker bumps the generation in Redis and publishes it
+        await cache.remote.invalidate(namespace)
+        assert await cache.versioned_key(namespace, 0, 100) == key
+        cache.handle_invalidation(f"ns:{namespace}")
+        assert await cache.versioned_key(namespace, 0, 100) != key
+
+        await cache.set("auth:principal:x", {"id": 1})
+        await cache.remote.delete("auth:principal:x")
+        cache.handle_invalidation("key:auth:principal:x")
+        assert await cache.get("auth:principal:x") is None
+
+    asyncio.run(run())
+
+def test_cache_health_check(client):
+    """Test the per-tier cache statistics endpoint."""
+    response = client.get("/health/cache")
+    assert response.status_code == 200
+    assert set(response.json()["cache"]) == {"l1", "l2"}
+    assert response.json()["redis_pool"]["breaker"] == "closed"
+
+def test_get_or_load_coalesces_concurrent_misses():
+    """Test that concurrent misses on one key run the loader once."""
+    cache = _tiered()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [{"id": 1}]
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load("tasks:page", loader) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result == [{"id": 1}] for result in results)
+
+def test_get_or_load_serves_stale_while_one_caller_refreshes():
+    """Test stale-while-revalidate: only the lock winner reloads."""
+    import time
+
+    cache = _tiered()
+    asyncio.run(cache.set("page", {"value": "old", "fresh_until": time.time() - 1, "delta": 0.01}, expire=60))
+
+    async def loader():
+        return "new"
+
+    async def run():
+        # Another worker holds the refresh lease: the stale value is served
+        token = await cache.remote.acquire_lock("lock:page", 1000)
+        stale = await cache.get_or_load("page", loader, stale_ttl=30)
+        await cache.remote.release_lock("lock:page", token)
+        fresh = await cache.get_or_load("page", loader, stale_ttl=30)
+        return stale, fresh
+
+    assert asyncio.run(run()) == ("old", "new")
+    assert asyncio.run(cache.get_or_load("page", loader, stale_ttl=30, beta=0)) == "new"
+
+def test_cached_decorator_keys_on_arguments():
+    """Test the decorator form used by the router page loaders."""
+    cache = _tiered()
+    calls = []
+
+    @cache.cached(lambda user_id, page: f"items:{user_id}:{page}")
+    async def load(user_id, page):
+        calls.append((user_id, page))
+        return [user_id, page]
+
+    async def run():
+        return [await load(1, 0), await load(1, 0), await load(2, 0)]
+
+    assert asyncio.run(run()) == [[1, 0], [1, 0], [2, 0]]
+    assert calls == [(1, 0), (2, 0)]
+
+def test_cached_decorator_awaits_async_key_builders():
+    """Test that key builders may return the versioned_key coroutine."""
+    cache = _tiered()
+
+    @cache.cached(lambda user_id: cache.versioned_key(user_namespace("items", user_id)))
+    async def load(user_id):
+        return [user_id]
+
+    async def run():
+        first = await load(1)
+        await cache.invalidate(user_namespace("items", 1))
+        return first, await load(1)
+
+    assert asyncio.run(run()) == ([1], [1])
+    assert len([key for key in cache.remote._data if key.startswith("items:user:1:")]) == 2
+
+def test_circuit_breaker_opens_and_probes():
+    """Test closed -> open after repeated failures -> half-open probe -> closed."""
+    from core.redis_pool import CircuitBreaker
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    # reset_timeout=0: the breaker goes straight to half-open
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+def test_redis_pool_fails_fast_when_redis_is_down():
+    """Test that run() returns its default and stops calling a failing server."""
+    from redis.exceptions import ConnectionError
+    from core.redis_pool import CircuitBreaker, RedisPool
+
+    calls = []
+
+    class DownClient:
+        async def get(self, key):
+            calls.append(key)
+            raise ConnectionError("connection refused")
+
+    pool = RedisPool()
+    pool.client = DownClient()
+    pool.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    async def run():
+        return [await pool.run(lambda client: client.get("k"), default="miss") for _ in range(10)]
+
+    assert asyncio.run(run()) == ["miss"] * 10
+    assert len(calls) == 3
+    assert pool.breaker.state == "open"
+
+def test_shared_generation_is_none_without_redis():
+    """Test that process-local fallback generations are not offered as shared ones."""
+    from core.cache import LocalLRUCache, TieredCache
+
+    class DownRemote(MockRedisCache):
+        async def generation(self, namespace):
+            return None
+
+    tiered = TieredCache(DownRemote(), LocalLRUCache())
+    namespace = user_namespace("tasks", 1)
+
+    async def run():
+        assert await tiered.shared_generation(namespace) is None
+        first = await tiered.generation(namespace)
+        await tiered.invalidate(namespace)
+        assert await tiered.generation(namespace) == first + 1
+        assert await tiered.shared_generation(namespace) is None
+
+    asyncio.run(run())
+
+def test_idle_invalidation_listener_stays_subscribed():
+    """Test that a quiet channel outlasting the socket timeout keeps one subscription."""
+    from core.cache import INVALIDATION_CHANNEL, RedisCache
+    from core.redis_pool import REDIS_SOCKET_TIMEOUT, RedisPool
+
+    async def run():
+        subscribers, received = [], []
+
+        async def serve(reader, writer):
+            # Just enough RESP for a subscriber: SUBSCRIBE and PING answered, anything else gets OK
+            while True:
+                header = await reader.readline()
+                if not header:
+                    return
+                command = []
+                for _ in range(int(header[1:])):
+                    await reader.readline()
+                    command.append((await reader.readline()).strip().decode())
+                if command[0].upper() == "SUBSCRIBE":
+                    subscribers.append(writer)
+                    channel = command[1]
+                    writer.write(f"*3\r\n$9\r\nsubscribe\r\n${len(channel)}\r\n{channel}\r\n:1\r\n".encode())
+                elif command[0].upper() == "PING":
+                    writer.write(b"+PONG\r\n")
+                else:
+                    writer.write(b"+OK\r\n")
+                await writer.drain()
+
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        pool = RedisPool(f"redis://127.0.0.1:{server.sockets[0].getsockname()[1]}")
+        pool.client = object()
+        listener = asyncio.create_task(RedisCache(pool).listen(received.append))
+        try:
+            await asyncio.sleep(REDIS_SOCKET_TIMEOUT * 3)
+            assert len(subscribers) == 1
+
+            data = "ns:tasks:user:1"
+            subscribers[0].write(
+                f"*3\r\n$7\r\nmessage\r\n${len(INVALIDATION_CHANNEL)}\r\n{INVALIDATION_CHANNEL}\r\n"
+                f"${len(data)}\r\n{data}\r\n".encode()
+            )
+            await subscribers[0].drain()
+            for _ in range(50):
+                if received:
+                    break
+                await asyncio.sleep(0.02)
+            assert received == [data]
+        finally:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+            server.close()
+
+    asyncio.run(run())
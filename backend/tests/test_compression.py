@@ -0,0 +1,101 @@
+import pytest
+import zstandard
+from fastapi import status
+
+import core.compression as compression
+from core.compression import encoded_etag, negotiate, strip_encoding
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("identity", None),
+        ("gzip, deflate, br, zstd", "zstd"),
+        ("gzip, br", "br"),
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("*;q=0.1, zstd;q=0", "br"),
+        ("br;q=0, gzip;q=0", None),
+    ],
+)
+def test_negotiate(header, expected):
+    """Test Accept-Encoding negotiation by q-value, then server preference."""
+    assert negotiate(header) == expected
+
+def test_encoded_etags_round_trip():
+    """Test that encoding suffixes apply to strong tags only and strip back off."""
+    assert encoded_etag('"abc-12"', "br") == '"abc-12-br"'
+    assert strip_encoding('"abc-12-br"') == '"abc-12"'
+    assert encoded_etag('W/"abc"', "gzip") == 'W/"abc"'
+
+@pytest.fixture
+def many_tasks(test_user, db_session):
+    from models import Task
+
+    db_session.add_all(
+        Task(title=f"Task {i}", description="Details " * 20, owner_id=test_user.id) for i in range(40)
+    )
+    db_session.commit()
+
+@pytest.fixture
+def compress_calls(monkeypatch):
+    """Count one-shot compressions per encoding."""
+    calls = []
+    for name, (one_shot, stream) in list(compression.ENCODINGS.items()):
+        def counted(data, name=name, one_shot=one_shot):
+            calls.append(name)
+            return one_shot(data)
+        monkeypatch.setitem(compression.ENCODINGS, name, (counted, stream))
+    return calls
+
+def test_cached_list_is_served_precompressed(client, auth_headers, many_tasks, compress_calls):
+    """Test that a cache hit sends the stored variant without compressing again."""
+    identity = client.get("/tasks", headers={**auth_headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert "Accept-Encoding" in identity.headers["vary"]
+    assert sorted(compress_calls) == ["br", "gzip"]
+
+    response = client.get("/tasks", headers={**auth_headers, "Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(identity.content) / 4
+    assert response.content == identity.content
+    assert response.headers["etag"] == identity.headers["etag"][:-1] + '-gzip"'
+    assert sorted(compress_calls) == ["br", "gzip"]
+
+    # The encoded tag revalidates like the plain one
+    response = client.get("/tasks", headers={**auth_headers, "If-None-Match": response.headers["etag"]})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+def test_uncached_encodings_are_compressed_on_the_fly(client, auth_headers, many_tasks):
+    """Test middleware compression for an encoding the cache does not keep."""
+    identity = client.get("/tasks", headers={**auth_headers, "Accept-Encoding": "identity"})
+    response = client.get("/tasks", headers={**auth_headers, "Accept-Encoding": "zstd"})
+    assert response.headers["content-encoding"] == "zstd"
+    assert zstandard.ZstdDecompressor().decompress(response.content) == identity.content
+
+def test_small_responses_are_not_compressed(client, auth_headers):
+    """Test that bodies under COMPRESSION_MIN_SIZE are sent as is."""
+    response = client.get("/tasks", headers={**auth_headers, "Accept-Encoding": "gzip"})
+    assert response.status_code == status.HTTP_200_OK
+    assert "content-encoding" not in response.headers
+
+def test_streamed_export_is_compressed(client, auth_headers, many_tasks):
+    """Test chunk-by-chunk compression of a streamed export."""
+    response = client.get("/tasks/export?format=csv", headers={**auth_headers, "Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br"
+    assert "content-length" not in response.headers
+    assert len(response.text.splitlines()) == 41
+
+def test_large_bodies_are_compressed_off_the_event_loop(client, auth_headers, many_tasks, monkeypatch):
+    """Test that bodies over the thread threshold go through the thread pool."""
+    offloaded = []
+
+    async def run_in_threadpool(func, *args):
+        offloaded.append(len(args[0]))
+        return func(*args)
+
+    monkeypatch.setattr(compression, "COMPRESSION_THREAD_MIN_SIZE", 2048)
+    monkeypatch.setattr(compression, "run_in_threadpool", run_in_threadpool)
+    response = client.get("/tasks/export", headers={**auth_headers, "Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert offloaded and min(offloaded) >= 2048
+    assert len(response.text.splitlines()) == 40
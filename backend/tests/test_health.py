@@ -26,4 +26,43 @@ def test_root_endpoint(client):
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert data["status"] == "healthy"
-    assert "message" in data 
\ No newline at end of file
+    assert "message" in data
+
+def test_pool_health_check(client):
+    """Test connection pool statistics endpoint."""
+    response = client.get("/health/pool")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["status"] == "healthy"
+    assert "pool" in data["database_pool"]
+
+def test_instrumented_pool_records_checkout_waits(tmp_path):
+    """Test that the instrumented pool tracks checkouts and wait times."""
+    import asyncio
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from core.db_pool import InstrumentedAsyncQueuePool, pool_status
+
+    async def run():
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=2,
+            max_overflow=0,
+        )
+        try:
+            for _ in range(3):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            async with engine.connect():
+                return pool_status(engine.sync_engine)
+        finally:
+            await engine.dispose()
+
+    stats = asyncio.run(run())
+    assert stats["pool"] == "InstrumentedAsyncQueuePool"
+    assert stats["size"] == 2
+    assert stats["checked_out"] == 1
+    assert stats["checkouts"] == 4
+    assert stats["wait_ms"]["count"] == 4
+    assert stats["wait_ms"]["buckets"]["+Inf"] == 4
@@ -0,0 +1,48 @@
+import pytest
+from datetime import date
+from sqlalchemy import select, text
+from sqlalchemy.dialects import sqlite
+
+from core.pagination import encode_cursor, paginate
+from models import Project, Task
+
+def _query_plan(db_session, query):
+    compiled = query.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+    rows = db_session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+@pytest.mark.parametrize("model, index_name", [
+    (Task, "ix_tasks_owner_id_created_at_id"),
+    (Project, "ix_projects_owner_id_created_at_id"),
+])
+def test_list_queries_use_owner_index(db_session, model, index_name):
+    """Test that offset and cursor listings are served by the owner index."""
+    base = select(model).where(model.owner_id == 1)
+
+    plan = _query_plan(db_session, paginate(base, model, 0, 100, None))
+    assert index_name in plan
+    assert "TEMP B-TREE" not in plan
+
+    cursor = encode_cursor("2024-01-01T00:00:00", 10)
+    plan = _query_plan(db_session, paginate(base, model, 0, 100, cursor))
+    assert index_name in plan
+
+def test_project_task_query_uses_project_index(db_session):
+    """Test that a project's tasks are found through (project_id, owner_id)."""
+    query = select(Task).where(Task.project_id == 1, Task.owner_id == 1)
+    assert "ix_tasks_project_id_owner_id" in _query_plan(db_session, query)
+
+@pytest.mark.parametrize("filters, index_name", [
+    ({"completed": True}, "ix_tasks_owner_id_completed_created_at_id"),
+    ({"priorities": ("High",)}, "ix_tasks_owner_id_priority_created_at_id"),
+    ({"sort": "due_date"}, "ix_tasks_owner_id_due_date_id"),
+    # Without statistics SQLite may pick either due-date index here
+    ({"overdue_on": date(2024, 1, 1)}, "ix_tasks_owner_id_due_date_"),
+])
+def test_task_filters_use_matching_index(db_session, filters, index_name):
+    """Test that listing filters are served by their composite or partial index."""
+    from routers.tasks import TaskListQuery
+
+    query_filters = TaskListQuery(**filters)
+    query = query_filters.page(query_filters.where(select(Task).where(Task.owner_id == 1)), 0, 100, None)
+    assert index_name in _query_plan(db_session, query)
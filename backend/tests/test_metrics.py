@@ -0,0 +1,63 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from core.metrics import instrument_engine
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_metrics_endpoint_labels_requests_by_route_template(client, auth_headers):
+    """Test that request counts use the route template, not the raw path."""
+    before = _sample("http_requests_total", method="GET", route="/tasks/{task_id}", status="404")
+    client.get("/tasks/12345", headers=auth_headers)
+    client.get("/tasks/67890", headers=auth_headers)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "http_request_duration_seconds_bucket" in response.text
+    assert 'route="/tasks/12345"' not in response.text
+    assert _sample("http_requests_total", method="GET", route="/tasks/{task_id}", status="404") == before + 2
+
+def test_unmatched_paths_share_one_label(client):
+    """Test that unknown paths cannot create unbounded label values."""
+    before = _sample("http_requests_total", method="GET", route="<unmatched>", status="404")
+    client.get("/no/such/path")
+    assert _sample("http_requests_total", method="GET", route="<unmatched>", status="404") == before + 1
+
+def test_cache_lookups_are_counted(client, auth_headers):
+    """Test that list reads count L1/L2 cache hits and misses."""
+    before_miss = _sample("cache_requests_total", tier="l2", result="miss")
+    before_hit = _sample("cache_requests_total", tier="l1", result="hit")
+    client.get("/tasks", headers=auth_headers)
+    client.get("/tasks", headers=auth_headers)
+    assert _sample("cache_requests_total", tier="l2", result="miss") > before_miss
+    assert _sample("cache_requests_total", tier="l1", result="hit") > before_hit
+
+def test_instrumented_engine_counts_queries():
+    """Test the engine events behind db_queries_total and the latency histogram."""
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    before = _sample("db_queries_total", operation="SELECT")
+    before_observations = _sample("db_query_duration_seconds_count", operation="SELECT")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("  select 2"))
+    assert _sample("db_queries_total", operation="SELECT") == before + 2
+    assert _sample("db_query_duration_seconds_count", operation="SELECT") == before_observations + 2
+
+def test_failed_statements_leave_no_timing_state():
+    """Test that a statement that raises does not leave its start time on the connection."""
+    from sqlalchemy.exc import OperationalError
+
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    before = _sample("db_queries_total", operation="SELECT")
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing"))
+        conn.execute(text("SELECT 1"))
+        assert "query_start" not in conn.info
+    assert _sample("db_queries_total", operation="SELECT") == before + 1
@@ -0,0 +1,64 @@
+import json
+import logging
+import pytest
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+
+from core.logging_config import JsonFormatter
+from core.middleware import RequestLoggingMiddleware, SecurityHeadersMiddleware
+
+def test_security_headers_on_api_responses(client):
+    """Test that every response carries the security headers."""
+    response = client.get("/health")
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+    assert response.headers["X-Frame-Options"] == "DENY"
+    assert "max-age=31536000" in response.headers["Strict-Transport-Security"]
+
+def test_request_logging_emits_structured_record(client, caplog):
+    """Test that each request produces one record with its fields as attributes."""
+    with caplog.at_level(logging.INFO, logger="taskflow.access"):
+        client.get("/tasks/999")
+
+    records = [record for record in caplog.records if record.name == "taskflow.access"]
+    assert len(records) == 1
+    record = records[0]
+    assert (record.method, record.path, record.status) == ("GET", "/tasks/999", 401)
+    assert record.duration_ms >= 0
+
+def test_middleware_passes_streaming_bodies_through():
+    """Test that chunks reach the client unbuffered and the request is logged once done."""
+    sent = []
+
+    async def chunks():
+        for i in range(3):
+            sent.append(i)
+            yield f"{i}\n".encode()
+
+    async def streaming_app(scope, receive, send):
+        await StreamingResponse(chunks(), media_type="text/plain")(scope, receive, send)
+
+    logger = logging.getLogger("test.access")
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        app = RequestLoggingMiddleware(SecurityHeadersMiddleware(streaming_app), logger=logger)
+        response = TestClient(app).get("/export")
+    finally:
+        logger.removeHandler(handler)
+
+    assert response.text == "0\n1\n2\n"
+    assert response.headers["X-Frame-Options"] == "DENY"
+    assert sent == [0, 1, 2]
+    assert len(records) == 1 and records[0].status == 200
+
+def test_json_formatter_includes_extra_fields():
+    """Test the one-object-per-line log format."""
+    record = logging.LogRecord("taskflow.access", logging.INFO, __file__, 1, "request", (), None)
+    record.status = 200
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "request"
+    assert entry["level"] == "INFO"
+    assert entry["status"] == 200
@@ -0,0 +1,37 @@
+import logging
+import pytest
+
+def test_server_timing_reports_request_queries(client, auth_headers):
+    """Test that the Server-Timing header counts this request's statements."""
+    # The first request resolves the user, the second finds it cached
+    first = client.get("/tasks/999", headers=auth_headers).headers["Server-Timing"]
+    timing = client.get("/tasks/999", headers=auth_headers).headers["Server-Timing"]
+    assert first.startswith("db;dur=")
+    assert 'desc="2 queries"' in first
+    assert 'desc="1 queries"' in timing
+    assert "app;dur=" in timing
+
+def test_slow_queries_are_logged_with_parameters(client, auth_headers, caplog, monkeypatch):
+    """Test that statements over SLOW_QUERY_MS are logged with their parameters."""
+    import core.profiling
+
+    monkeypatch.setattr(core.profiling, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="taskflow.slow_query"):
+        client.get("/tasks/4242", headers=auth_headers)
+
+    records = [record for record in caplog.records if record.name == "taskflow.slow_query"]
+    task_queries = [record for record in records if "FROM tasks" in record.statement]
+    assert len(task_queries) == 1
+    assert "4242" in task_queries[0].parameters
+    assert task_queries[0].duration_ms >= 0
+
+def test_assert_max_queries_reports_statements(client, auth_headers, assert_max_queries):
+    """Test the query budget fixture itself."""
+    client.get("/tasks/1", headers=auth_headers)
+    with assert_max_queries(1):
+        client.get("/tasks/1", headers=auth_headers)
+
+    with pytest.raises(AssertionError, match="2 queries, expected at most 1"):
+        with assert_max_queries(1):
+            client.get("/tasks/1", headers=auth_headers)
+            client.get("/tasks/2", headers=auth_headers)
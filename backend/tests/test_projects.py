@@ -107,4 +107,239 @@ def test_delete_project(client, auth_headers, test_user, db_session):
     
     # Verify it's deleted
     response = client.get(f"/projects/{project.id}", headers=auth_headers)
-    assert response.status_code == status.HTTP_404_NOT_FOUND 
\ No newline at end of file
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+def test_get_projects_cursor_pagination(client, auth_headers, test_user, db_session):
+    """Test paging projects with the cursor from X-Next-Cursor."""
+    from models import Project
+
+    for i in range(3):
+        db_session.add(Project(name=f"Project {i}", owner_id=test_user.id))
+    db_session.commit()
+
+    first = client.get("/projects?limit=2", headers=auth_headers)
+    assert [p["name"] for p in first.json()] == ["Project 0", "Project 1"]
+    cursor = first.headers["X-Next-Cursor"]
+    # A cache hit must hand out the same cursor
+    cached = client.get("/projects?limit=2", headers=auth_headers)
+    assert cached.headers["X-Next-Cursor"] == cursor
+
+    second = client.get(f"/projects?limit=2&cursor={cursor}", headers=auth_headers)
+    assert [p["name"] for p in second.json()] == ["Project 2"]
+    assert "X-Next-Cursor" not in second.headers
+
+def _add_projects_with_tasks(db_session, owner_id, projects=3, tasks_per_project=2):
+    from models import Project, Task
+
+    for i in range(projects):
+        project = Project(name=f"Project {i}", owner_id=owner_id)
+        db_session.add(project)
+        db_session.flush()
+        for j in range(tasks_per_project):
+            db_session.add(Task(title=f"Task {i}.{j}", project_id=project.id, owner_id=owner_id))
+    db_session.commit()
+
+def test_get_projects_loads_tasks_in_bounded_queries(
+    client, auth_headers, test_user, db_session, sql_statements, assert_max_queries
+):
+    """Test that listing projects does not issue one task query per project."""
+    _add_projects_with_tasks(db_session, test_user.id, projects=5)
+
+    # Principal, projects, and their counts from the rollup; no task rows
+    with assert_max_queries(3):
+        response = client.get("/projects", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert all(p["task_count"] == 2 and "tasks" not in p for p in response.json())
+    assert not any("FROM tasks" in s for s in sql_statements)
+
+    # include=tasks adds one query for all the projects' tasks
+    with assert_max_queries(4):
+        response = client.get("/projects?include=tasks", headers=auth_headers)
+    assert all(len(p["tasks"]) == 2 for p in response.json())
+    task_queries = [s for s in sql_statements if "FROM tasks" in s]
+    assert len(task_queries) == 1
+
+def test_get_projects_fields_skips_tasks(client, auth_headers, test_user, db_session, sql_statements):
+    """Test that ?fields= trims the payload and skips task loading."""
+    _add_projects_with_tasks(db_session, test_user.id)
+
+    response = client.get("/projects?fields=id,name", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert all(set(p) == {"id", "name"} for p in response.json())
+    assert not any("FROM tasks" in s for s in sql_statements)
+
+    response = client.get("/projects?fields=id,name&include=tasks", headers=auth_headers)
+    assert all(set(p) == {"id", "name", "tasks"} for p in response.json())
+
+def test_get_project_fields(client, auth_headers, test_user, db_session):
+    """Test field selection on the project detail endpoint."""
+    from models import Project
+
+    project = Project(name="Detail", owner_id=test_user.id)
+    db_session.add(project)
+    db_session.commit()
+    db_session.refresh(project)
+
+    response = client.get(f"/projects/{project.id}?fields=name,status", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"name": "Detail", "status": "Not Started"}
+
+    response = client.get(f"/projects/{project.id}?fields=bogus", headers=auth_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_project_writes_are_single_statements(client, auth_headers, test_user, db_session, assert_max_queries):
+    """Test UPDATE ... RETURNING with task counts, and delete cascading to tasks."""
+    from models import Project, Task
+
+    _add_projects_with_tasks(db_session, test_user.id, projects=1)
+    project = db_session.query(Project).filter_by(owner_id=test_user.id).one()
+    assert len(client.get("/tasks", headers=auth_headers).json()) == 2
+
+    # The UPDATE plus one query for the project's task counts
+    with assert_max_queries(2):
+        response = client.put(f"/projects/{project.id}", json={"status": "Done"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "Done"
+    assert response.json()["task_count"] == 2
+
+    with assert_max_queries(2):
+        response = client.delete(f"/projects/{project.id}", headers=auth_headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert db_session.query(Task).count() == 0
+    assert client.get("/tasks", headers=auth_headers).json() == []
+
+def test_delete_other_users_project(client, auth_headers, test_user, db_session):
+    """Test that another user's project and its tasks survive a delete attempt."""
+    from models import Project, Task
+
+    _add_projects_with_tasks(db_session, test_user.id + 1, projects=1)
+    project = db_session.query(Project).one()
+
+    response = client.put(f"/projects/{project.id}", json={"name": "Mine now"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = client.delete(f"/projects/{project.id}", headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert db_session.query(Task).count() == 2
+
+def test_export_projects(client, auth_headers, test_user, db_session):
+    """Test project exports, including an empty CSV with only its header."""
+    import json
+
+    response = client.get("/projects/export?format=csv", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.text.strip().split(",")[:2] == ["name", "description"]
+
+    _add_projects_with_tasks(db_session, test_user.id, projects=3)
+    response = client.get("/projects/export", headers=auth_headers)
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["name"] for row in rows] == ["Project 0", "Project 1", "Project 2"]
+    assert "tasks" not in rows[0]
+
+def test_project_conditional_requests(client, auth_headers, test_user, db_session, sql_statements):
+    """Test project ETags per representation and their invalidation by task writes."""
+    from models import Project
+
+    _add_projects_with_tasks(db_session, test_user.id, projects=1)
+    project = db_session.query(Project).filter_by(owner_id=test_user.id).one()
+
+    list_etag = client.get("/projects", headers=auth_headers).headers["etag"]
+    full = client.get(f"/projects/{project.id}", headers=auth_headers).headers["etag"]
+    trimmed = client.get(f"/projects/{project.id}?fields=name", headers=auth_headers).headers["etag"]
+    assert trimmed != full
+
+    count = len(sql_statements)
+    for url, etag in [("/projects", list_etag), (f"/projects/{project.id}?fields=name", trimmed)]:
+        response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert len(sql_statements) == count
+
+    # Projects carry their task counts, so a task write changes the project's ETag
+    client.post("/tasks", json={"title": "New", "project_id": project.id}, headers=auth_headers)
+    response = client.get(f"/projects/{project.id}", headers={**auth_headers, "If-None-Match": full})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["task_count"] == 3
+
+    # Any representation's ETag works for If-Match
+    etag = client.get(f"/projects/{project.id}?fields=name", headers=auth_headers).headers["etag"]
+    response = client.put(f"/projects/{project.id}", json={"name": "Renamed"}, headers={**auth_headers, "If-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    response = client.put(f"/projects/{project.id}", json={"name": "Lost"}, headers={**auth_headers, "If-Match": etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+def test_project_list_matches_schema_serialization(client, auth_headers, test_user, db_session):
+    """Test that projected project pages equal the detail JSON, with and without fields."""
+    from models import Project
+
+    _add_projects_with_tasks(db_session, test_user.id, projects=2)
+    ids = [project.id for project in db_session.query(Project).order_by(Project.id)]
+    details = [client.get(f"/projects/{project_id}", headers=auth_headers).json() for project_id in ids]
+    assert client.get("/projects", headers=auth_headers).json() == details
+
+    details = [client.get(f"/projects/{project_id}?include=tasks", headers=auth_headers).json() for project_id in ids]
+    assert client.get("/projects?include=tasks", headers=auth_headers).json() == details
+    trimmed = client.get("/projects?fields=name,tasks", headers=auth_headers).json()
+    assert trimmed == [{"name": d["name"], "tasks": d["tasks"]} for d in details]
+    headers_only = client.get("/projects?fields=id,name&limit=1", headers=auth_headers)
+    assert headers_only.json() == [{"name": details[0]["name"], "id": ids[0]}]
+    assert "x-next-cursor" in headers_only.headers
+
+def test_project_summary_and_included_tasks(client, auth_headers, test_user, db_session):
+    """Test that projects carry task counts by default and embed tasks on request."""
+    from models import Project
+
+    _add_projects_with_tasks(db_session, test_user.id, projects=1, tasks_per_project=3)
+    project = db_session.query(Project).filter_by(owner_id=test_user.id).one()
+    task_id = client.get(f"/projects/{project.id}/tasks", headers=auth_headers).json()[0]["id"]
+    client.put(f"/tasks/{task_id}", json={"completed": True}, headers=auth_headers)
+
+    summary = client.get(f"/projects/{project.id}", headers=auth_headers)
+    assert summary.json()["task_count"] == 3
+    assert summary.json()["completed_count"] == 1
+    assert "tasks" not in summary.json()
+
+    nested = client.get(f"/projects/{project.id}?include=tasks", headers=auth_headers)
+    assert [task["title"] for task in nested.json()["tasks"]] == ["Task 0.0", "Task 0.1", "Task 0.2"]
+    assert nested.headers["etag"] != summary.headers["etag"]
+
+    response = client.get(f"/projects/{project.id}?fields=name,completed_count", headers=auth_headers)
+    assert response.json() == {"name": "Project 0", "completed_count": 1}
+
+def test_project_tasks_subresource(client, auth_headers, test_user, db_session, sql_statements):
+    """Test paging and filtering a project's tasks, and its ETags."""
+    from models import Project
+
+    _add_projects_with_tasks(db_session, test_user.id, projects=2, tasks_per_project=3)
+    first, second = db_session.query(Project).order_by(Project.id).all()
+
+    page = client.get(f"/projects/{first.id}/tasks?limit=2", headers=auth_headers)
+    assert page.status_code == status.HTTP_200_OK
+    assert [task["title"] for task in page.json()] == ["Task 0.0", "Task 0.1"]
+    cursor = page.headers["X-Next-Cursor"]
+    rest = client.get(f"/projects/{first.id}/tasks?limit=2&cursor={cursor}", headers=auth_headers)
+    assert [task["title"] for task in rest.json()] == ["Task 0.2"]
+    assert "X-Next-Cursor" not in rest.headers
+
+    client.put(f"/tasks/{page.json()[0]['id']}", json={"completed": True}, headers=auth_headers)
+    response = client.get(f"/projects/{first.id}/tasks?completed=false&sort=-created_at", headers=auth_headers)
+    assert [task["title"] for task in response.json()] == ["Task 0.2", "Task 0.1"]
+    # Same page as the equivalent /tasks request
+    assert response.json() == client.get(
+        f"/tasks?project_id={first.id}&completed=false&sort=-created_at", headers=auth_headers
+    ).json()
+
+    etag = client.get(f"/projects/{second.id}/tasks", headers=auth_headers).headers["etag"]
+    count = len(sql_statements)
+    response = client.get(f"/projects/{second.id}/tasks", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert len(sql_statements) == count
+
+def test_project_tasks_of_other_user(client, auth_headers, test_user, db_session):
+    """Test that another user's project tasks are not found."""
+    from models import Project
+
+    _add_projects_with_tasks(db_session, test_user.id + 1, projects=1)
+    project = db_session.query(Project).one()
+    response = client.get(f"/projects/{project.id}/tasks", headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = client.get(f"/projects/{project.id + 1}/tasks", headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,93 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+from core.middleware import LocalTokenBucket, RateLimitMiddleware, RateLimitRule, parse_rules
+from core.redis_pool import RedisPool
+from core.security import create_access_token
+
+async def ok_app(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+def _client(**options):
+    # No Redis client is connected, so the local token bucket is used
+    options.setdefault("pool", RedisPool())
+    return TestClient(RateLimitMiddleware(ok_app, **options))
+
+def test_rate_limit_headers_and_429():
+    """Test that requests past the limit get a 429 with Retry-After."""
+    client = _client(default="3/60", routes="")
+    remaining = []
+    for _ in range(3):
+        response = client.get("/tasks")
+        assert response.status_code == 200
+        assert response.headers["RateLimit-Limit"] == "3"
+        assert response.headers["RateLimit-Policy"] == "3;w=60"
+        remaining.append(int(response.headers["RateLimit-Remaining"]))
+    assert remaining == [2, 1, 0]
+
+    response = client.get("/tasks")
+    assert response.status_code == 429
+    assert response.json()["detail"].startswith("Rate limit exceeded")
+    assert 1 <= int(response.headers["Retry-After"]) <= 20
+
+def test_rate_limit_is_per_user():
+    """Test that each token subject gets its own budget."""
+    client = _client(default="1/60", routes="")
+    alice = {"Authorization": f"Bearer {create_access_token({'sub': 'alice'})}"}
+    bob = {"Authorization": f"Bearer {create_access_token({'sub': 'bob'})}"}
+
+    assert client.get("/tasks", headers=alice).status_code == 200
+    assert client.get("/tasks", headers=alice).status_code == 429
+    assert client.get("/tasks", headers=bob).status_code == 200
+    # An invalid token is limited by client address, not by its claimed subject
+    assert client.get("/tasks", headers={"Authorization": "Bearer junk"}).status_code == 200
+
+def test_rate_limit_route_rules_and_exemptions():
+    """Test per-route overrides and paths that are never limited."""
+    client = _client(default="100/60", routes="POST /auth/token=1/60")
+
+    assert client.post("/auth/token").status_code == 200
+    assert client.post("/auth/token").status_code == 429
+    assert client.get("/auth/me").headers["RateLimit-Limit"] == "100"
+    for _ in range(3):
+        response = client.get("/health")
+        assert response.status_code == 200
+        assert "RateLimit-Limit" not in response.headers
+
+def test_parse_rules_prefers_longest_prefix():
+    """Test that the most specific route rule wins."""
+    rules = parse_rules("GET /tasks=50/60, GET /tasks/export=2/60")
+    assert [rule.prefix for rule in rules] == ["/tasks/export", "/tasks"]
+    middleware = RateLimitMiddleware(ok_app, routes="GET /tasks=50/60,GET /tasks/export=2/60")
+    assert middleware.rule_for("GET", "/tasks/export").limit == 2
+    assert middleware.rule_for("POST", "/tasks/export").name == "default"
+
+def test_local_token_bucket_refills(monkeypatch):
+    """Test that the fallback bucket refills at limit/period tokens per second."""
+    import core.middleware
+
+    now = [1000.0]
+    monkeypatch.setattr(core.middleware.time, "monotonic", lambda: now[0])
+    bucket = LocalTokenBucket()
+    rule = RateLimitRule("default", limit=2, period=10)
+
+    assert bucket.hit("k", rule)[:2] == (1, 1)
+    assert bucket.hit("k", rule)[:2] == (1, 0)
+    allowed, _, retry_after_ms, _ = bucket.hit("k", rule)
+    assert (allowed, retry_after_ms) == (0, 5000)
+
+    now[0] += 5
+    assert bucket.hit("k", rule)[0] == 1
+
+def test_rate_limit_uses_redis_result_when_available():
+    """Test that the Redis script's answer is used instead of the local bucket."""
+    class AnsweringPool:
+        async def run(self, operation, default=None):
+            return [0, 0, 2500, 60000]
+
+    client = _client(default="100/60", routes="", pool=AnsweringPool())
+    response = client.get("/tasks")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+    assert response.headers["RateLimit-Reset"] == "60"
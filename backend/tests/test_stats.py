@@ -0,0 +1,124 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi import status
+
+def _expected(db_session, owner_id, project_id=None):
+    """Totals computed from the tasks themselves, to check the rollup against."""
+    from models import Task
+
+    today = date.today()
+    query = db_session.query(Task).filter(Task.owner_id == owner_id)
+    if project_id is not None:
+        query = query.filter(Task.project_id == project_id)
+    tasks = query.all()
+    return {
+        "total": len(tasks),
+        "completed": sum(task.completed for task in tasks),
+        "overdue": sum(not task.completed and task.due_date is not None and task.due_date < today for task in tasks),
+        "High": sum(task.priority == "High" for task in tasks),
+    }
+
+def _actual(stats):
+    return {
+        "total": stats["total"],
+        "completed": stats["completed"],
+        "overdue": stats["overdue"],
+        "High": stats["by_priority"].get("High", {}).get("total", 0),
+    }
+
+def test_stats_follow_every_write_path(client, auth_headers, test_user, db_session):
+    """Test that the rollup stays equal to counting the tasks after each kind of write."""
+    past = (date.today() - timedelta(days=3)).isoformat()
+    future = (date.today() + timedelta(days=3)).isoformat()
+    project_id = client.post("/projects", json={"name": "Home"}, headers=auth_headers).json()["id"]
+
+    def check():
+        db_session.expire_all()
+        stats = client.get("/stats", headers=auth_headers).json()
+        assert _actual(stats) == _expected(db_session, test_user.id)
+        project = client.get(f"/projects/{project_id}/stats", headers=auth_headers).json()
+        assert _actual(project) == _expected(db_session, test_user.id, project_id)
+        return stats
+
+    first = client.post("/tasks", json={"title": "Late", "due_date": past, "priority": "High"}, headers=auth_headers).json()
+    check()
+    response = client.post("/tasks/bulk", headers=auth_headers, json={"items": [
+        {"title": f"Bulk {i}", "project_id": project_id, "due_date": past if i % 2 else future} for i in range(6)
+    ]})
+    ids = [task["id"] for task in response.json()["succeeded"]]
+    check()
+    body = "\n".join(f'{{"title": "Imported {i}", "priority": "High", "project_id": {project_id}}}' for i in range(4))
+    client.post("/tasks/import", content=body, headers=auth_headers)
+    check()
+
+    client.put(f"/tasks/{first['id']}", json={"completed": True, "project_id": project_id}, headers=auth_headers)
+    check()
+    client.patch("/tasks/bulk", json={"ids": ids[:3], "update": {"priority": "High", "due_date": None}}, headers=auth_headers)
+    check()
+    client.delete(f"/tasks/{ids[3]}", headers=auth_headers)
+    client.request("DELETE", "/tasks/bulk", json={"ids": ids[4:]}, headers=auth_headers)
+    stats = check()
+    assert [project["project_id"] for project in stats["projects"]] == [project_id]
+
+    client.delete(f"/projects/{project_id}", headers=auth_headers)
+    stats = client.get("/stats", headers=auth_headers).json()
+    assert stats["total"] == 0 and stats["projects"] == []
+
+def test_stats_breakdown(client, auth_headers, test_user, db_session):
+    """Test per-project and per-priority counts, completion rates and overdue status."""
+    from models import Project, Task
+
+    yesterday = date.today() - timedelta(days=1)
+    project = Project(name="Work", owner_id=test_user.id)
+    db_session.add(project)
+    db_session.commit()
+    db_session.add_all([
+        Task(title="a", priority="High", due_date=yesterday, project_id=project.id, owner_id=test_user.id),
+        Task(title="b", priority="High", due_date=yesterday, completed=True, project_id=project.id, owner_id=test_user.id),
+        Task(title="c", priority="Low", due_date=date.today(), project_id=project.id, owner_id=test_user.id),
+        Task(title="d", owner_id=test_user.id),
+        Task(title="other user", due_date=yesterday, owner_id=test_user.id + 1),
+    ])
+    db_session.commit()
+    db_session.query(Task).filter_by(title="d").update({"priority": None})
+    db_session.commit()
+
+    stats = client.get("/stats", headers=auth_headers).json()
+    assert {key: stats[key] for key in ("total", "completed", "open", "overdue")} == {
+        "total": 4, "completed": 1, "open": 3, "overdue": 1
+    }
+    assert stats["completion_rate"] == 0.25
+    assert stats["by_priority"]["High"] == {
+        "total": 2, "completed": 1, "open": 1, "overdue": 1, "completion_rate": 0.5
+    }
+    assert stats["by_priority"]["none"]["total"] == 1
+    assert [(p["project_id"], p["total"]) for p in stats["projects"]] == [(None, 1), (project.id, 3)]
+
+    response = client.get(f"/projects/{project.id}/stats", headers=auth_headers)
+    assert response.json()["total"] == 3
+    assert response.json()["by_priority"]["Low"]["overdue"] == 0
+    assert "projects" not in response.json()
+
+def test_stats_cost_does_not_grow_with_tasks(client, auth_headers, test_user, db_session, assert_max_queries):
+    """Test that stats are one query over rollup rows, and 404 for foreign projects."""
+    from models import Project, Task, TaskStat
+
+    db_session.add_all(Task(title=f"t{i}", priority="Medium", owner_id=test_user.id) for i in range(200))
+    # Completed tasks are never overdue, so their due dates do not add rows
+    db_session.add_all(
+        Task(title=f"done{i}", priority="Medium", completed=True, due_date=date(2024, 1, 1 + i), owner_id=test_user.id)
+        for i in range(20)
+    )
+    project = Project(name="Theirs", owner_id=test_user.id + 1)
+    db_session.add(project)
+    db_session.commit()
+    assert db_session.query(TaskStat).count() == 2
+
+    client.get("/stats", headers=auth_headers)
+    db_session.add(Task(title="one more", priority="Medium", owner_id=test_user.id))
+    db_session.commit()
+    with assert_max_queries(1):
+        assert client.get("/stats", headers=auth_headers).json()["total"] == 221
+    response = client.get(f"/projects/{project.id}/stats", headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
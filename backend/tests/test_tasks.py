@@ -123,4 +123,483 @@ def test_delete_task(client, auth_headers, test_user, db_session):
 def test_task_unauthorized_access(client):
     """Test accessing tasks without authentication."""
     response = client.get("/tasks")
-    assert response.status_code == status.HTTP_401_UNAUTHORIZED 
\ No newline at end of file
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_get_tasks_cursor_pagination(client, auth_headers, test_user, db_session):
+    """Test walking all tasks with keyset cursors."""
+    from models import Task
+
+    for i in range(5):
+        db_session.add(Task(title=f"Task {i}", owner_id=test_user.id))
+    db_session.commit()
+
+    response = client.get("/tasks?limit=2", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    titles = [t["title"] for t in response.json()]
+    cursor = response.headers.get("X-Next-Cursor")
+    while cursor:
+        response = client.get(f"/tasks?limit=2&cursor={cursor}", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        titles.extend(t["title"] for t in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert titles == [f"Task {i}" for i in range(5)]
+
+def test_get_tasks_invalid_cursor(client, auth_headers):
+    """Test that malformed cursors and cursor+skip are rejected."""
+    response = client.get("/tasks?cursor=not-a-cursor", headers=auth_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    from core.pagination import encode_cursor
+    cursor = encode_cursor("2024-01-01T00:00:00", 1)
+    response = client.get(f"/tasks?skip=1&cursor={cursor}", headers=auth_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_task_endpoints_query_budget(client, auth_headers, test_user, db_session, assert_max_queries):
+    """Lock in the number of SQL statements per task endpoint."""
+    from models import Task
+
+    task = Task(title="Budget", owner_id=test_user.id)
+    db_session.add(task)
+    db_session.commit()
+    db_session.refresh(task)
+
+    # Principal lookup plus the page query; the repeat is served from cache
+    with assert_max_queries(2):
+        client.get("/tasks", headers=auth_headers)
+    with assert_max_queries(0):
+        client.get("/tasks", headers=auth_headers)
+    with assert_max_queries(1):
+        client.get(f"/tasks/{task.id}", headers=auth_headers)
+    # Writes are a single UPDATE/DELETE ... RETURNING
+    with assert_max_queries(1):
+        response = client.put(f"/tasks/{task.id}", json={"completed": True}, headers=auth_headers)
+    assert response.json()["completed"] is True
+    with assert_max_queries(1):
+        client.delete(f"/tasks/{task.id}", headers=auth_headers)
+
+def test_update_and_delete_other_users_task(client, auth_headers, test_user, db_session):
+    """Test that writes to a task of another user return 404 and change nothing."""
+    from models import Task
+
+    task = Task(title="Not mine", owner_id=test_user.id + 1)
+    db_session.add(task)
+    db_session.commit()
+    db_session.refresh(task)
+
+    response = client.put(f"/tasks/{task.id}", json={"title": "Hijacked"}, headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = client.put(f"/tasks/{task.id}", json={}, headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = client.delete(f"/tasks/{task.id}", headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    db_session.expire_all()
+    assert db_session.get(Task, task.id).title == "Not mine"
+
+def test_bulk_create_tasks(client, auth_headers, test_user, db_session, assert_max_queries):
+    """Test creating a batch with one INSERT and per-item errors."""
+    from models import Project
+
+    other = Project(name="Not mine", owner_id=test_user.id + 1)
+    db_session.add(other)
+    db_session.commit()
+    db_session.refresh(other)
+    client.get("/tasks", headers=auth_headers)
+
+    items = [
+        {"title": "One", "priority": "High"},
+        {"description": "no title"},
+        {"title": "Two"},
+        {"title": "Foreign", "project_id": other.id},
+    ]
+    # Project ownership check plus one INSERT ... RETURNING
+    with assert_max_queries(2):
+        response = client.post("/tasks/bulk", json={"items": items}, headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [t["title"] for t in data["succeeded"]] == ["One", "Two"]
+    assert data["succeeded"][0]["priority"] == "High"
+    assert [(e["index"], e["detail"] == "Project not found") for e in data["failed"]] == [(1, False), (3, True)]
+    assert data["failed"][0]["detail"][0]["loc"] == ["title"]
+
+    titles = [t["title"] for t in client.get("/tasks", headers=auth_headers).json()]
+    assert titles == ["One", "Two"]
+
+def test_bulk_update_and_delete_tasks(client, auth_headers, test_user, db_session, assert_max_queries):
+    """Test bulk completion and deletion with missing ids reported per item."""
+    from models import Task
+
+    tasks = [Task(title=f"Task {i}", owner_id=test_user.id) for i in range(3)]
+    foreign = Task(title="Someone else's", owner_id=test_user.id + 1)
+    db_session.add_all(tasks + [foreign])
+    db_session.commit()
+    ids = [task.id for task in tasks]
+    client.get("/tasks", headers=auth_headers)
+
+    with assert_max_queries(1):
+        response = client.patch(
+            "/tasks/bulk",
+            json={"ids": [ids[1], ids[0], foreign.id], "update": {"completed": True}},
+            headers=auth_headers,
+        )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [t["id"] for t in data["succeeded"]] == [ids[1], ids[0]]
+    assert all(t["completed"] for t in data["succeeded"])
+    assert data["failed"] == [{"index": None, "id": foreign.id, "detail": "Task not found"}]
+    completed = {t["id"]: t["completed"] for t in client.get("/tasks", headers=auth_headers).json()}
+    assert completed == {ids[0]: True, ids[1]: True, ids[2]: False}
+
+    with assert_max_queries(1):
+        response = client.request(
+            "DELETE", "/tasks/bulk", json={"ids": [ids[0], ids[2], 99999]}, headers=auth_headers
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["deleted"] == [ids[0], ids[2]]
+    assert [e["id"] for e in response.json()["failed"]] == [99999]
+    assert [t["id"] for t in client.get("/tasks", headers=auth_headers).json()] == [ids[1]]
+
+def test_bulk_rejects_oversized_batches(client, auth_headers):
+    """Test the batch size limit."""
+    from schemas.task import BULK_MAX_ITEMS
+
+    ids = list(range(1, BULK_MAX_ITEMS + 2))
+    response = client.request("DELETE", "/tasks/bulk", json={"ids": ids}, headers=auth_headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_export_tasks_ndjson_and_csv(client, auth_headers, test_user, db_session, monkeypatch):
+    """Test streaming exports across several cursor batches."""
+    import csv
+    import io
+    import json
+    import core.export
+    from models import Task
+
+    monkeypatch.setattr(core.export, "EXPORT_BATCH_SIZE", 2)
+    db_session.add_all(
+        [Task(title=f"Task {i}", owner_id=test_user.id, due_date=date(2024, 1, i + 1)) for i in range(5)]
+        + [Task(title="Someone else's", owner_id=test_user.id + 1)]
+    )
+    db_session.commit()
+
+    response = client.get("/tasks/export", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert 'filename="tasks.ndjson"' in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == [f"Task {i}" for i in range(5)]
+    assert rows[0]["due_date"] == "2024-01-01"
+    assert rows[0]["completed"] is False
+
+    response = client.get("/tasks/export?format=csv", headers=auth_headers)
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["title"] for row in rows] == [f"Task {i}" for i in range(5)]
+    assert rows[4]["due_date"] == "2024-01-05"
+    assert rows[0]["project_id"] == ""
+
+    assert client.get("/tasks/export?format=xml", headers=auth_headers).status_code == 422
+
+def test_import_tasks_ndjson(client, auth_headers, test_user, db_session, monkeypatch):
+    """Test chunked NDJSON import with per-line errors and progress."""
+    import json
+    import routers.tasks
+    from models import Task
+
+    monkeypatch.setattr(routers.tasks, "IMPORT_CHUNK_SIZE", 2)
+    client.get("/tasks", headers=auth_headers)
+    lines = [
+        json.dumps({"title": "One", "priority": "High"}),
+        "{not json",
+        "",
+        json.dumps({"title": "Two", "due_date": "2024-03-01"}),
+        json.dumps({"description": "missing title"}),
+        json.dumps({"title": "Foreign", "project_id": 999}),
+        json.dumps({"title": "Three", "completed": True}),
+    ]
+    body = ("\n".join(lines) + "\n").encode()
+    response = client.post(
+        "/tasks/import", content=iter([body[:7], body[7:40], body[40:]]), headers=auth_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert (data["imported"], data["failed"]) == (3, 3)
+    assert [e["line"] for e in data["errors"]] == [2, 5, 6]
+    assert data["errors"][0]["detail"].startswith("Invalid JSON")
+    assert data["errors"][1]["detail"][0]["loc"] == ["title"]
+    assert data["errors"][2]["detail"] == "Project not found"
+    assert [(c["first_line"], c["last_line"], c["imported"]) for c in data["chunks"]] == [
+        (1, 2, 1), (4, 5, 1), (6, 7, 1)
+    ]
+
+    tasks = client.get("/tasks", headers=auth_headers).json()
+    assert [t["title"] for t in tasks] == ["One", "Two", "Three"]
+    assert tasks[1]["due_date"] == "2024-03-01"
+    assert tasks[2]["completed"] is True
+    assert db_session.query(Task).filter(Task.created_at.is_(None)).count() == 0
+
+def test_import_tasks_csv(client, auth_headers):
+    """Test CSV import, including quoted fields that span lines."""
+    body = (
+        "title,description,priority,due_date\r\n"
+        'Plain,,Low,\r\n'
+        '"Quoted, title","first line\nsecond line",High,2024-05-01\r\n'
+        "Short row\r\n"
+    )
+    response = client.post("/tasks/import?format=csv", content=body.encode(), headers=auth_headers)
+    data = response.json()
+    assert (data["imported"], data["failed"]) == (2, 1)
+    assert data["errors"][0]["line"] == 5
+
+    tasks = client.get("/tasks", headers=auth_headers).json()
+    assert [t["title"] for t in tasks] == ["Plain", "Quoted, title"]
+    assert tasks[0]["description"] is None
+    assert tasks[1]["description"] == "first line\nsecond line"
+
+def test_import_tasks_csv_recovers_from_stray_quote(client, auth_headers, monkeypatch):
+    """Test that an unbalanced quote fails its own line and later rows still import."""
+    monkeypatch.setattr("core.importing.IMPORT_MAX_RECORD_LINES", 3)
+    rows = "".join(f"Task {i},Low\r\n" for i in range(5))
+    body = 'title,description\r\nA,has a 5" screen\r\n' + rows
+    response = client.post("/tasks/import?format=csv", content=body.encode(), headers=auth_headers)
+    data = response.json()
+    assert (data["imported"], data["failed"]) == (5, 1)
+    assert data["errors"][0]["line"] == 2
+    assert "Unterminated" in data["errors"][0]["detail"]
+
+    # Same at the end of the input, before the record cap is reached
+    monkeypatch.setattr("core.importing.IMPORT_MAX_RECORD_LINES", 100)
+    body = 'title,description\r\nB,has a 7" screen\r\nLast,Low\r\n'
+    data = client.post("/tasks/import?format=csv", content=body.encode(), headers=auth_headers).json()
+    assert (data["imported"], data["failed"]) == (1, 1)
+    assert data["errors"][0]["line"] == 2
+
+def _add_filter_tasks(db_session, owner_id):
+    from models import Project, Task
+
+    project = Project(name="Filtered", owner_id=owner_id)
+    db_session.add(project)
+    db_session.flush()
+    db_session.add_all([
+        Task(title="a-overdue", owner_id=owner_id, priority="High", due_date=date(2000, 1, 1)),
+        Task(title="b-done", owner_id=owner_id, priority="Low", completed=True, due_date=date(2000, 1, 2)),
+        Task(title="c-future", owner_id=owner_id, priority="Medium", due_date=date(2999, 1, 1),
+             project_id=project.id),
+        Task(title="d-undated", owner_id=owner_id, priority="Low"),
+    ])
+    db_session.commit()
+    return project
+
+def test_get_tasks_filters(client, auth_headers, test_user, db_session):
+    """Test server-side filters on the task listing."""
+    project = _add_filter_tasks(db_session, test_user.id)
+
+    def titles(query):
+        response = client.get(f"/tasks?{query}", headers=auth_headers)
+        assert response.status_code == status.HTTP_200_OK
+        return [t["title"] for t in response.json()]
+
+    assert titles("completed=true") == ["b-done"]
+    assert titles("completed=false") == ["a-overdue", "c-future", "d-undated"]
+    assert titles("priority=Low") == ["b-done", "d-undated"]
+    assert titles("priority=High,Medium") == ["a-overdue", "c-future"]
+    assert titles(f"project_id={project.id}") == ["c-future"]
+    assert titles("due_after=2000-01-02&due_before=2100-01-01") == ["b-done"]
+    assert titles("overdue=true") == ["a-overdue"]
+    assert titles("overdue=true&priority=Low") == []
+
+def test_get_tasks_sorting(client, auth_headers, test_user, db_session):
+    """Test whitelisted sort keys and their pagination rules."""
+    _add_filter_tasks(db_session, test_user.id)
+
+    def titles(query):
+        return [t["title"] for t in client.get(f"/tasks?{query}", headers=auth_headers).json()]
+
+    assert titles("sort=due_date") == ["a-overdue", "b-done", "c-future", "d-undated"]
+    assert titles("sort=-due_date") == ["c-future", "b-done", "a-overdue", "d-undated"]
+    assert titles("sort=priority") == ["a-overdue", "c-future", "b-done", "d-undated"]
+    assert titles("sort=-title&limit=2") == ["d-undated", "c-future"]
+    assert titles("sort=-title&limit=2&skip=2") == ["b-done", "a-overdue"]
+
+    response = client.get("/tasks?sort=-created_at&limit=3", headers=auth_headers)
+    assert [t["title"] for t in response.json()] == ["d-undated", "c-future", "b-done"]
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/tasks?sort=-created_at&cursor={cursor}", headers=auth_headers)
+    assert [t["title"] for t in response.json()] == ["a-overdue"]
+
+    assert "X-Next-Cursor" not in client.get("/tasks?sort=title&limit=1", headers=auth_headers).headers
+    assert client.get(f"/tasks?sort=title&cursor={cursor}", headers=auth_headers).status_code == 400
+    assert client.get("/tasks?sort=owner_id", headers=auth_headers).status_code == 400
+
+def test_equivalent_filters_share_a_cache_entry(client, auth_headers, test_user, db_session, sql_statements):
+    """Test that the cache key is derived from normalized filters."""
+    _add_filter_tasks(db_session, test_user.id)
+
+    first = client.get("/tasks?priority=Low,High", headers=auth_headers).json()
+    count = len(sql_statements)
+    second = client.get("/tasks?priority=High,%20Low,High&sort=created_at", headers=auth_headers).json()
+    assert second == first
+    assert len(sql_statements) == count
+
+    # A value spelling out another filter does not share its entry
+    project = _add_filter_tasks(db_session, test_user.id)
+    assert len(client.get(f"/tasks?priority=Medium&project_id={project.id}", headers=auth_headers).json()) == 1
+    response = client.get(f"/tasks?priority=Medium%26project_id%3D{project.id}", headers=auth_headers)
+    assert response.json() == []
+
+def test_search_tasks(client, auth_headers, test_user, db_session):
+    """Test ranked, highlighted search through the SQLite FTS5 index."""
+    from models import Task
+
+    db_session.add_all([
+        Task(title="Write quarterly report", description="Numbers for finance", owner_id=test_user.id),
+        Task(title="Call the plumber", description="The quarterly bathroom report is due", owner_id=test_user.id),
+        Task(title="Quarterly report", description="Someone else's", owner_id=test_user.id + 1),
+        Task(title="Buy milk", owner_id=test_user.id),
+        Task(title="<b>Bold</b> & cheese", owner_id=test_user.id),
+    ])
+    db_session.commit()
+
+    # Task text is escaped; only the highlight markup is HTML
+    results = client.get("/tasks/search?q=bold", headers=auth_headers).json()
+    assert results[0]["title_highlight"] == "&lt;b&gt;<mark>Bold</mark>&lt;/b&gt; &amp; cheese"
+
+    response = client.get("/tasks/search?q=report quarterly", headers=auth_headers)
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()
+    # Title matches outrank description matches; other users' tasks never show up
+    assert [r["title"] for r in results] == ["Write quarterly report", "Call the plumber"]
+    assert results[0]["rank"] > results[1]["rank"]
+    assert results[0]["title_highlight"] == "Write <mark>quarterly</mark> <mark>report</mark>"
+    assert "<mark>quarterly</mark>" in results[1]["description_highlight"]
+
+    # Prefix and stemmed matches
+    assert [r["title"] for r in client.get("/tasks/search?q=plumb", headers=auth_headers).json()] == ["Call the plumber"]
+    assert [r["title"] for r in client.get("/tasks/search?q=reports", headers=auth_headers).json()] == [
+        "Write quarterly report", "Call the plumber"
+    ]
+
+def test_search_index_follows_writes(client, auth_headers, test_user, db_session):
+    """Test that updates and deletes are reflected in search results."""
+    response = client.post("/tasks", json={"title": "Renew passport"}, headers=auth_headers)
+    task_id = response.json()["id"]
+    assert len(client.get("/tasks/search?q=passport", headers=auth_headers).json()) == 1
+
+    client.put(f"/tasks/{task_id}", json={"title": "Renew visa"}, headers=auth_headers)
+    assert client.get("/tasks/search?q=passport", headers=auth_headers).json() == []
+    assert len(client.get("/tasks/search?q=visa", headers=auth_headers).json()) == 1
+
+    client.delete(f"/tasks/{task_id}", headers=auth_headers)
+    assert client.get("/tasks/search?q=visa", headers=auth_headers).json() == []
+    assert client.get("/tasks/search?q=%21%21", headers=auth_headers).json() == []
+    assert client.get("/tasks/search?q=", headers=auth_headers).status_code == 422
+
+def test_search_unsupported_dialect_is_not_implemented():
+    """Test that search on a database without full-text support answers 501."""
+    import asyncio
+    from fastapi import HTTPException
+    from core.search import search_tasks
+
+    class Session:
+        async def connection(self):
+            class Connection:
+                class dialect:
+                    name = "mysql"
+            return Connection()
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(search_tasks(Session(), 1, "milk", 10))
+    assert raised.value.status_code == status.HTTP_501_NOT_IMPLEMENTED
+
+def test_task_list_conditional_get(client, auth_headers, sql_statements):
+    """Test ETags on the task list: 304 without queries until a write changes the list."""
+    client.post("/tasks", json={"title": "First"}, headers=auth_headers)
+    response = client.get("/tasks", headers=auth_headers)
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+    # Different filters are different representations
+    assert client.get("/tasks?completed=true", headers=auth_headers).headers["etag"] != etag
+
+    count = len(sql_statements)
+    response = client.get("/tasks", headers={**auth_headers, "If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert len(sql_statements) == count
+
+    client.post("/tasks", json={"title": "Second"}, headers=auth_headers)
+    response = client.get("/tasks", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 2
+    assert response.headers["etag"] != etag
+
+def test_task_detail_conditional_get_and_if_match(client, auth_headers):
+    """Test If-None-Match on a task and If-Match optimistic concurrency on PUT."""
+    task_id = client.post("/tasks", json={"title": "Draft"}, headers=auth_headers).json()["id"]
+    etag = client.get(f"/tasks/{task_id}", headers=auth_headers).headers["etag"]
+    response = client.get(f"/tasks/{task_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = client.put(
+        f"/tasks/{task_id}", json={"title": "Final"}, headers={**auth_headers, "If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    # The first writer changed the task, so a second one holding the same ETag loses
+    response = client.put(
+        f"/tasks/{task_id}", json={"title": "Overwritten"}, headers={**auth_headers, "If-Match": etag}
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = client.put(
+        f"/tasks/{task_id}", json={"title": "Weak"}, headers={**auth_headers, "If-Match": f"W/{etag}"}
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert client.get(f"/tasks/{task_id}", headers=auth_headers).json()["title"] == "Final"
+
+    response = client.put(f"/tasks/{task_id}", json={"title": "Any"}, headers={**auth_headers, "If-Match": "*"})
+    assert response.status_code == status.HTTP_200_OK
+    # Missing tasks carry no ETag
+    response = client.get("/tasks/99999", headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert "etag" not in response.headers
+    # If-None-Match: * cannot turn a missing task into a 304
+    response = client.get("/tasks/99999", headers={**auth_headers, "If-None-Match": "*"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = client.get(f"/tasks/{task_id}", headers={**auth_headers, "If-None-Match": "*"})
+    assert response.status_code == status.HTTP_200_OK
+
+def test_if_match_is_skipped_without_redis(client, auth_headers, monkeypatch):
+    """Test that an unverifiable If-Match does not fail the write as a conflict."""
+    from core.cache import cache
+
+    task_id = client.post("/tasks", json={"title": "Draft"}, headers=auth_headers).json()["id"]
+    etag = client.get(f"/tasks/{task_id}", headers=auth_headers).headers["etag"]
+
+    async def unavailable(namespace):
+        return None
+
+    monkeypatch.setattr(cache, "shared_generation", unavailable)
+    response = client.put(f"/tasks/{task_id}", json={"title": "Final"}, headers={**auth_headers, "If-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert "etag" not in client.get(f"/tasks/{task_id}", headers=auth_headers).headers
+
+def test_task_list_matches_schema_serialization(client, auth_headers, test_user, db_session):
+    """Test that column-projected, pre-encoded pages equal the TaskSchema JSON, hit or miss."""
+    from datetime import date, datetime
+    from core.cache import cache
+    from models import Task
+
+    db_session.add(Task(
+        title="Ünïcode \"quoted\"", description=None, priority="High", due_date=date(2025, 3, 1),
+        created_at=datetime(2025, 1, 1, 12, 30, 15, 123456), owner_id=test_user.id,
+    ))
+    db_session.commit()
+    task_id = db_session.query(Task).one().id
+    detail = client.get(f"/tasks/{task_id}", headers=auth_headers).json()
+
+    response = client.get("/tasks", headers=auth_headers)
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == [detail]
+    # Served from L1, then from L2 once the local tier is gone
+    assert client.get("/tasks", headers=auth_headers).content == response.content
+    cache.local.clear()
+    assert client.get("/tasks", headers=auth_headers).content == response.content
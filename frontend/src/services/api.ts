@@ -105,6 +105,23 @@ export const projectsAPI = {
   deleteProject: async (id: number) => {
     await api.delete(`/projects/${id}`);
   },
+
+  getProjectStats: async (id: number) => {
+    const response = await api.get(`/projects/${id}/stats`);
+    return response.data;
+  },
+  getProjectTasks: async (id: number) => {
+    const response = await api.get(`/projects/${id}/tasks`);
+    return response.data;
+  },
+};
+
+// Dashboard counts, served from server-side rollups instead of every task
+export const statsAPI = {
+  getStats: async () => {
+    const response = await api.get('/stats');
+    return response.data;
+  },
 };
 
 export default api;
\ No newline at end of file